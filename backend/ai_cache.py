@@ -0,0 +1,163 @@
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config  # noqa: F401  (loads .env)
+from database import AsyncSessionLocal, dialect_insert
+from metrics import register_cache
+from models import AIResponseCache
+
+# Cache configuration
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+AI_CACHE_MEMORY_MAX_BYTES = int(os.getenv("AI_CACHE_MEMORY_MAX_BYTES", str(16 * 1024 * 1024)))
+AI_CACHE_DB_MAX_ROWS = int(os.getenv("AI_CACHE_DB_MAX_ROWS", "10000"))
+# Trim the table once every this many writes rather than on each one
+AI_CACHE_TRIM_EVERY = int(os.getenv("AI_CACHE_TRIM_EVERY", "100"))
+
+
+@dataclass
+class CachedResponse:
+    response: str
+    video_id: Optional[int]
+    expires_at: datetime
+    size: int = 0
+
+
+class ResponseCache:
+    """
+    Content-addressed cache for AI responses.
+
+    Entries are keyed by a hash of the request type, model, normalized
+    prompt and the video they were generated for. Lookups go to an in-memory LRU first, bounded by total response
+    size, and fall back to the ai_response_cache table. Entries expire after
+    a TTL, the table is trimmed to a maximum row count every trim_every
+    writes (so it can briefly hold up to trim_every more rows), and
+    everything generated for a video can be dropped when that video changes.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = AI_CACHE_TTL_SECONDS,
+        memory_max_bytes: int = AI_CACHE_MEMORY_MAX_BYTES,
+        db_max_rows: int = AI_CACHE_DB_MAX_ROWS,
+        trim_every: int = AI_CACHE_TRIM_EVERY,
+    ):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.memory_max_bytes = memory_max_bytes
+        self.db_max_rows = db_max_rows
+        self.trim_every = max(1, trim_every)
+        self._writes = 0
+        self._memory: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(request_type: str, model: str, prompt: str, video_id: Optional[int] = None) -> str:
+        """
+        Hash a request into a cache key; whitespace differences don't matter.
+
+        The video is part of the key so that invalidating one video never
+        leaves behind an entry that another video with the same prompt
+        stored and tagged.
+        """
+        normalized = " ".join(prompt.split())
+        return hashlib.sha256(f"{request_type}\0{model}\0{video_id}\0{normalized}".encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a cached response, checking memory before the database."""
+        now = datetime.utcnow()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry.response
+            self._forget(key)
+
+        async with AsyncSessionLocal() as db:
+            row = await db.get(AIResponseCache, key)
+        if row is None or row.expires_at <= now:
+            self.misses += 1
+            return None
+
+        self._remember(key, CachedResponse(row.response, row.video_id, row.expires_at))
+        self.hits += 1
+        return row.response
+
+    async def set(self, key: str, request_type: str, response: str, video_id: Optional[int] = None) -> None:
+        """Store a response in both tiers."""
+        now = datetime.utcnow()
+        expires_at = now + self.ttl
+        self._remember(key, CachedResponse(response, video_id, expires_at))
+
+        row = {
+            "key": key,
+            "request_type": request_type,
+            "video_id": video_id,
+            "response": response,
+            "created_at": now,
+            "expires_at": expires_at,
+        }
+        async with AsyncSessionLocal() as db:
+            stmt = dialect_insert(db, AIResponseCache).values(**row)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AIResponseCache.key],
+                set_={k: v for k, v in row.items() if k != "key"},
+            )
+            await db.execute(stmt)
+
+            self._writes += 1
+            if self._writes % self.trim_every == 0:
+                await self._trim(db, now)
+            await db.commit()
+
+    async def _trim(self, db: AsyncSession, now: datetime) -> None:
+        """Drop expired rows and anything beyond the newest db_max_rows."""
+        # Both deletes walk the expires_at and created_at indexes
+        await db.execute(delete(AIResponseCache).where(AIResponseCache.expires_at <= now))
+        overflow = (
+            select(AIResponseCache.key)
+            .order_by(AIResponseCache.created_at.desc())
+            .offset(self.db_max_rows)
+            .scalar_subquery()
+        )
+        await db.execute(delete(AIResponseCache).where(AIResponseCache.key.in_(overflow)))
+
+    async def invalidate_video(self, video_id: int) -> None:
+        """Drop every cached response generated for a video."""
+        for key in [k for k, e in self._memory.items() if e.video_id == video_id]:
+            self._forget(key)
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(AIResponseCache).where(AIResponseCache.video_id == video_id))
+            await db.commit()
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        if key in self._memory:
+            self._forget(key)
+        entry.size = len(entry.response.encode("utf-8"))
+        if entry.size > self.memory_max_bytes:
+            return
+        self._memory[key] = entry
+        self._memory_bytes += entry.size
+        while self._memory_bytes > self.memory_max_bytes:
+            oldest = next(iter(self._memory))
+            self._forget(oldest)
+
+    def _forget(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry.size
+
+
+# Initialize AI response cache
+ai_response_cache = ResponseCache()
+register_cache("ai_response", ai_response_cache)
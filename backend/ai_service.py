@@ -1,9 +1,22 @@
+import json
 import os
-from typing import Optional
+import time
+from typing import AsyncIterator, Optional, Tuple
 import httpx
-from dotenv import load_dotenv
 
-load_dotenv()
+import config  # noqa: F401  (loads .env)
+from ai_cache import ai_response_cache
+from metrics import UPSTREAM_REQUEST_DURATION, status_class, upstream_timer
+
+CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+
+# Claude HTTP client configuration
+CLAUDE_API_URL = os.getenv("CLAUDE_API_URL", "https://api.anthropic.com/v1")
+CLAUDE_HTTP2 = os.getenv("CLAUDE_HTTP2", "true").lower() == "true"
+CLAUDE_MAX_CONNECTIONS = int(os.getenv("CLAUDE_MAX_CONNECTIONS", "50"))
+CLAUDE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("CLAUDE_MAX_KEEPALIVE_CONNECTIONS", "20"))
+CLAUDE_CONNECT_TIMEOUT = float(os.getenv("CLAUDE_CONNECT_TIMEOUT", "5"))
+CLAUDE_TIMEOUT = float(os.getenv("CLAUDE_TIMEOUT", "30"))
 
 
 class AIAssistant:
@@ -11,11 +24,107 @@ class AIAssistant:
 
     def __init__(self):
         self.api_key = os.getenv("CLAUDE_API_KEY", "")
-        self.base_url = "https://api.anthropic.com/v1"
+        self.base_url = CLAUDE_API_URL
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        """Open the shared HTTP client (called on startup)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=CLAUDE_HTTP2,
+                limits=httpx.Limits(
+                    max_connections=CLAUDE_MAX_CONNECTIONS,
+                    max_keepalive_connections=CLAUDE_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                timeout=httpx.Timeout(CLAUDE_TIMEOUT, connect=CLAUDE_CONNECT_TIMEOUT),
+                headers={
+                    "x-api-key": self.api_key,
+                    "anthropic-version": "2023-06-01",
+                    "content-type": "application/json",
+                },
+            )
+
+    async def close(self) -> None:
+        """Close the shared HTTP client (called on shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def answer_question(self, question: str, context: Optional[str] = None) -> str:
         """Answer user questions about video content."""
-        prompt = f"""
+        prompt = self._question_prompt(question, context)
+        
+        return await self._call_claude(prompt)
+
+    async def generate_summary(
+        self,
+        video_title: str,
+        context: Optional[str] = None,
+        video_id: Optional[int] = None
+    ) -> str:
+        """Generate a concise summary of video content."""
+        prompt = self._summary_prompt(video_title, context)
+        
+        return await self._call_claude(prompt, cache_as="summary", video_id=video_id)
+
+    async def explain_concept(
+        self,
+        concept: str,
+        level: str = "beginner",
+        video_id: Optional[int] = None
+    ) -> str:
+        """Explain a concept in beginner-friendly language."""
+        prompt = self._explain_prompt(concept, level)
+        
+        return await self._call_claude(prompt, cache_as="explain", video_id=video_id)
+
+    async def generate_quiz(
+        self,
+        topic: str,
+        num_questions: int = 3,
+        video_id: Optional[int] = None
+    ) -> str:
+        """Generate a short quiz for learning reinforcement."""
+        prompt = self._quiz_prompt(topic, num_questions)
+        
+        return await self._call_claude(prompt, cache_as="quiz", video_id=video_id)
+
+    async def assist_note_taking(self, video_title: str, notes: str) -> str:
+        """Assist in organizing and improving notes."""
+        prompt = self._notes_prompt(video_title, notes)
+        
+        return await self._call_claude(prompt)
+
+    def assistance_prompt(
+        self,
+        request_type: str,
+        question: str,
+        context: Optional[str],
+        video_title: str,
+        video_description: Optional[str]
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Build the prompt for an assistant request, matching /api/ai/assistant.
+
+        Returns the prompt and the cache type it is stored under (None when
+        the request type isn't cached). Raises ValueError for unknown types.
+        """
+        if request_type == "question":
+            return self._question_prompt(question, context or video_title), None
+        if request_type == "summary":
+            return self._summary_prompt(video_title, context or video_description), "summary"
+        if request_type == "explain":
+            return self._explain_prompt(question, "beginner"), "explain"
+        if request_type == "quiz":
+            return self._quiz_prompt(question, 3), "quiz"
+        if request_type == "notes":
+            return self._notes_prompt(video_title, question), None
+        raise ValueError(f"Unknown request type: {request_type}")
+
+    def _question_prompt(self, question: str, context: Optional[str]) -> str:
+        """Prompt for answering a question about a video."""
+        return f"""
         A user is asking about video content they're watching.
         
         Video Context: {context or "No specific context provided"}
@@ -24,12 +133,10 @@ class AIAssistant:
         
         Please provide a clear, concise answer that helps them understand the concept better.
         """
-        
-        return await self._call_claude(prompt)
 
-    async def generate_summary(self, video_title: str, context: Optional[str] = None) -> str:
-        """Generate a concise summary of video content."""
-        prompt = f"""
+    def _summary_prompt(self, video_title: str, context: Optional[str]) -> str:
+        """Prompt for summarizing a video."""
+        return f"""
         Create a concise summary of a video with the following details:
         
         Video Title: {video_title}
@@ -37,24 +144,20 @@ class AIAssistant:
         
         The summary should be 3-5 bullet points covering the main topics.
         """
-        
-        return await self._call_claude(prompt)
 
-    async def explain_concept(self, concept: str, level: str = "beginner") -> str:
-        """Explain a concept in beginner-friendly language."""
-        prompt = f"""
+    def _explain_prompt(self, concept: str, level: str) -> str:
+        """Prompt for explaining a concept."""
+        return f"""
         Explain the following concept in {level}-friendly language:
         
         Concept: {concept}
         
         The explanation should be clear, use examples, and avoid heavy jargon.
         """
-        
-        return await self._call_claude(prompt)
 
-    async def generate_quiz(self, topic: str, num_questions: int = 3) -> str:
-        """Generate a short quiz for learning reinforcement."""
-        prompt = f"""
+    def _quiz_prompt(self, topic: str, num_questions: int) -> str:
+        """Prompt for a reinforcement quiz."""
+        return f"""
         Create {num_questions} quiz questions about this topic for learning reinforcement:
         
         Topic: {topic}
@@ -67,12 +170,10 @@ class AIAssistant:
         
         Make questions progressively harder.
         """
-        
-        return await self._call_claude(prompt)
 
-    async def assist_note_taking(self, video_title: str, notes: str) -> str:
-        """Assist in organizing and improving notes."""
-        prompt = f"""
+    def _notes_prompt(self, video_title: str, notes: str) -> str:
+        """Prompt for organizing study notes."""
+        return f"""
         Help organize and improve these study notes:
         
         Video Title: {video_title}
@@ -84,41 +185,122 @@ class AIAssistant:
         3. Suggest memory aids or mnemonics if helpful
         4. Format as a clear outline
         """
-        
-        return await self._call_claude(prompt)
 
-    async def _call_claude(self, prompt: str) -> str:
-        """Call Claude API."""
+    async def _call_claude(
+        self,
+        prompt: str,
+        cache_as: Optional[str] = None,
+        video_id: Optional[int] = None
+    ) -> str:
+        """
+        Call Claude API.
+
+        With cache_as set, identical prompts of that request type for the
+        same video_id are served from the response cache, and dropped when
+        that video is invalidated. Only successful responses are cached.
+        """
         if not self.api_key:
             return "Error: CLAUDE_API_KEY not configured. Please set it in environment variables or contact administrator."
         
+        cache_key = None
+        if cache_as:
+            cache_key = ai_response_cache.make_key(cache_as, CLAUDE_MODEL, prompt, video_id)
+            cached = await ai_response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Reuse pooled connections; start lazily outside the app lifespan
+        if self._client is None or self._client.is_closed:
+            await self.start()
+        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api.anthropic.com/v1/messages",
-                    headers={
-                        "x-api-key": self.api_key,
-                        "anthropic-version": "2023-06-01",
-                        "content-type": "application/json",
-                    },
+            with upstream_timer("claude") as timer:
+                response = await self._client.post(
+                    "/messages",
                     json={
-                        "model": "claude-3-5-sonnet-20241022",
+                        "model": CLAUDE_MODEL,
                         "max_tokens": 1024,
                         "messages": [{"role": "user", "content": prompt}],
                     },
-                    timeout=30.0,
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if "content" in data and len(data["content"]) > 0:
-                        return data["content"][0]["text"]
-                    return "No response from Claude API"
-                else:
-                    return f"Claude API error: {response.status_code} - {response.text}"
+                timer.outcome = status_class(response.status_code)
+            
+            if response.status_code == 200:
+                data = response.json()
+                if "content" in data and len(data["content"]) > 0:
+                    text = data["content"][0]["text"]
+                    if cache_key:
+                        await ai_response_cache.set(cache_key, cache_as, text, video_id)
+                    return text
+                return "No response from Claude API"
+            else:
+                return f"Claude API error: {response.status_code} - {response.text}"
         except Exception as e:
             return f"Error calling Claude API: {str(e)}"
 
+    async def stream_claude(
+        self,
+        prompt: str,
+        cache_as: Optional[str] = None,
+        video_id: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a Claude response as text chunks using the Messages API stream mode.
+
+        Cached responses are yielded in one chunk. A completed stream is
+        cached like _call_claude does. Closing the generator (for example
+        when the client disconnects) closes the upstream request. Raises
+        RuntimeError on API errors.
+        """
+        if not self.api_key:
+            raise RuntimeError("CLAUDE_API_KEY not configured. Please set it in environment variables or contact administrator.")
+        
+        cache_key = None
+        if cache_as:
+            cache_key = ai_response_cache.make_key(cache_as, CLAUDE_MODEL, prompt, video_id)
+            cached = await ai_response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        if self._client is None or self._client.is_closed:
+            await self.start()
+        
+        chunks = []
+        start = time.perf_counter()
+        async with self._client.stream(
+            "POST",
+            "/messages",
+            json={
+                "model": CLAUDE_MODEL,
+                "max_tokens": 1024,
+                "messages": [{"role": "user", "content": prompt}],
+                "stream": True,
+            },
+        ) as response:
+            # Time to first byte; the rest of the stream is paced by generation
+            UPSTREAM_REQUEST_DURATION.observe(
+                time.perf_counter() - start, "claude_stream", status_class(response.status_code)
+            )
+            if response.status_code != 200:
+                body = await response.aread()
+                raise RuntimeError(f"Claude API error: {response.status_code} - {body.decode(errors='replace')}")
+            
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                if event.get("type") == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text:
+                        chunks.append(text)
+                        yield text
+                elif event.get("type") == "error":
+                    raise RuntimeError(f"Claude API error: {event.get('error', {}).get('message', 'unknown')}")
+        
+        if cache_key and chunks:
+            await ai_response_cache.set(cache_key, cache_as, "".join(chunks), video_id)
+
 
 # Initialize AI assistant
 ai_assistant = AIAssistant()
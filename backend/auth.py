@@ -1,34 +1,81 @@
+import asyncio
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+import config  # noqa: F401  (loads .env)
+from metrics import register_cache
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# A rotated token replayed within this window is treated as a race between
+# tabs rather than theft
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_TOKEN_REUSE_GRACE_SECONDS", "30"))
+
+# Password hashing configuration. bcrypt releases the GIL, so a small thread
+# pool keeps hashing off the event loop without starving it of CPU.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+# Verified-token cache configuration
+AUTH_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_TOKEN_CACHE_MAX_ENTRIES", "10000"))
 
 # Password context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # Security scheme
 security = HTTPBearer()
 
+_password_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_password_executor() -> ThreadPoolExecutor:
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash",
+        )
+    return _password_executor
+
+
+def shutdown_password_executor() -> None:
+    """Stop the password hashing pool (called on shutdown)."""
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=True)
+        _password_executor = None
+
 
-def hash_password(password: str) -> str:
-    """Hash a password."""
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    """Hash a password on the password hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_password_executor(), pwd_context.hash, password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash on the password hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_password_executor(), pwd_context.verify, plain_password, hashed_password
+    )
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when a hash was made with a different cost than BCRYPT_ROUNDS."""
+    return pwd_context.needs_update(hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -45,19 +92,95 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def generate_refresh_token() -> Tuple[str, str]:
+    """Create an opaque refresh token; returns the token and the hash to store."""
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Digest a refresh token for storage and lookup.
+
+    Refresh tokens are random 256-bit values, so a fast hash is enough; only
+    user-chosen passwords need bcrypt.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenCache:
+    """
+    Bounded LRU of tokens whose signature has already been verified.
+
+    Entries are keyed by a SHA-256 digest of the token, so raw tokens are not
+    kept in memory, and each one is dropped once the token's own exp passes.
+    Tokens without an exp claim are never cached. Only used from the event
+    loop, so no locking is needed.
+    """
+
+    def __init__(self, max_entries: int = AUTH_TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return the cached payload for a still-valid token."""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            payload, expires_at = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, token: str, payload: dict) -> None:
+        """Remember a verified payload until its exp."""
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)) or self.max_entries <= 0:
+            return
+        key = self._key(token)
+        self._entries[key] = (payload, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Initialize verified-token cache
+token_cache = TokenCache()
+register_cache("auth_token", token_cache)
+
+
 def verify_token(token: str) -> dict:
     """Verify a JWT token and return payload."""
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token"
         )
+    
+    token_cache.put(token, payload)
+    return payload
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Dependency to get current user from token."""
     token = credentials.credentials
     payload = verify_token(token)
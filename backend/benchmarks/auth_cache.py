@@ -0,0 +1,57 @@
+"""
+Auth overhead per request with and without the verified-token cache.
+
+Calls the get_current_user dependency directly for a pool of active
+tokens, the way every authenticated request does, first with the cache
+disabled (a full jwt.decode each time) and then with it enabled.
+
+Usage:
+    python benchmarks/auth_cache.py --requests 50000 --tokens 500
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from common import configure
+
+
+async def time_requests(get_current_user, credentials, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        await get_current_user(random.choice(credentials))
+    return time.perf_counter() - start
+
+
+async def run(args):
+    configure()
+    from fastapi.security import HTTPAuthorizationCredentials
+    from auth import create_access_token, get_current_user, token_cache
+
+    credentials = [
+        HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": str(i)}))
+        for i in range(args.tokens)
+    ]
+
+    print(f"{'cache':<10} {'requests':>9} {'us/request':>11} {'hit ratio':>10}")
+    for label, max_entries in (("disabled", 0), ("enabled", args.tokens)):
+        token_cache.clear()
+        token_cache.max_entries = max_entries
+        token_cache.hits = token_cache.misses = 0
+        elapsed = await time_requests(get_current_user, credentials, args.requests)
+        lookups = token_cache.hits + token_cache.misses
+        print(
+            f"{label:<10} {args.requests:>9} {elapsed / args.requests * 1e6:>11.2f} "
+            f"{token_cache.hits / lookups if lookups else 0:>10.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--tokens", type=int, default=500, help="Distinct active tokens")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Per-call latency of the Claude client: shared pool vs a client per request.
+
+Starts a local mock of the Anthropic Messages endpoint (optionally behind
+TLS with a throwaway self-signed certificate) and times AIAssistant calls
+through the pooled, lifespan-managed client against the previous pattern
+of opening a new httpx.AsyncClient for every call.
+
+Usage:
+    python benchmarks/claude_client.py --calls 200 --tls
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import BACKEND_DIR, summarize
+
+RESPONSE_BODY = json.dumps({"content": [{"type": "text", "text": "ok"}]}).encode()
+
+
+async def handle_connection(reader, writer, delay):
+    """Minimal HTTP/1.1 keep-alive handler that answers every request with RESPONSE_BODY."""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            if delay:
+                await asyncio.sleep(delay)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                b"content-length: %d\r\n\r\n" % len(RESPONSE_BODY) + RESPONSE_BODY
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+        pass
+    finally:
+        writer.close()
+
+
+def start_mock_server(port, delay, ssl_context):
+    """Run the mock server on its own event loop in a background thread."""
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(asyncio.start_server(
+            lambda r, w: handle_connection(r, w, delay), "127.0.0.1", port, ssl=ssl_context
+        ))
+        ready.set()
+        loop.run_until_complete(server.serve_forever())
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+
+
+def self_signed_context(workdir):
+    """Create a localhost certificate with openssl and a server context for it."""
+    cert, key = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", key, "-out", cert, "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    context.set_alpn_protocols(["http/1.1"])
+    # httpx trusts SSL_CERT_FILE, so both clients accept the test certificate
+    os.environ["SSL_CERT_FILE"] = cert
+    return context
+
+
+async def time_calls(call, count):
+    samples = []
+    start = time.perf_counter()
+    for _ in range(count):
+        began = time.perf_counter()
+        result = await call()
+        samples.append(time.perf_counter() - began)
+        assert result == "ok", result
+    return summarize(samples, time.perf_counter() - start)
+
+
+async def run(args):
+    import httpx
+
+    scheme = "https" if args.tls else "http"
+    os.environ["CLAUDE_API_URL"] = f"{scheme}://localhost:{args.port}/v1"
+    os.environ["CLAUDE_API_KEY"] = "benchmark"
+    sys.path.insert(0, BACKEND_DIR)
+    from ai_service import AIAssistant
+
+    assistant = AIAssistant()
+
+    async def client_per_call():
+        # The pre-pooling implementation of _call_claude
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                f"{assistant.base_url}/messages",
+                headers={"x-api-key": assistant.api_key, "anthropic-version": "2023-06-01"},
+                json={"model": "claude-3-5-sonnet-20241022", "max_tokens": 1024,
+                      "messages": [{"role": "user", "content": "hi"}]},
+                timeout=30.0,
+            )
+            return response.json()["content"][0]["text"]
+
+    await assistant.start()
+    try:
+        results = {
+            "client_per_call": await time_calls(client_per_call, args.calls),
+            "shared_client": await time_calls(lambda: assistant._call_claude("hi"), args.calls),
+        }
+    finally:
+        await assistant.close()
+
+    print(f"mock server: {scheme}, {args.delay * 1000:.0f} ms simulated processing")
+    print(f"{'client':<16} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, stats in results.items():
+        print(f"{name:<16} {stats['requests']:>6} {stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Simulated server time per call in seconds")
+    parser.add_argument("--tls", action="store_true", help="Serve the mock over TLS (needs openssl)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="onestop-claude-bench-")
+    try:
+        ssl_context = self_signed_context(workdir) if args.tls else None
+        start_mock_server(args.port, args.delay, ssl_context)
+        asyncio.run(run(args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
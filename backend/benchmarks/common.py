@@ -0,0 +1,144 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure(database_url: str = None) -> str:
+    """
+    Point the app at a benchmark database.
+
+    Must run before any backend module is imported, because the engines are
+    created at import time. Defaults to a fresh SQLite file.
+    """
+    if database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="onestop-bench-"), "bench.sqlite")
+        database_url = f"sqlite:///{path}"
+    os.environ["DATABASE_URL"] = database_url
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    return database_url
+
+
+def seed(users: int, courses_per_user: int, videos_per_course: int) -> Dict:
+    """Create users, courses and videos and return their ids and access tokens."""
+    from auth import create_access_token
+    from database import SessionLocal, engine
+    from models import Base, Course, User, Video
+
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        user_rows = [User(email=f"bench{i}@example.com", password_hash="x") for i in range(users)]
+        db.add_all(user_rows)
+        db.flush()
+
+        course_rows = [
+            Course(user_id=user.id, title=f"Course {user.id}-{c}", is_public=False)
+            for user in user_rows
+            for c in range(courses_per_user)
+        ]
+        db.add_all(course_rows)
+        db.flush()
+
+        video_rows = [
+            Video(
+                course_id=course.id,
+                youtube_url=f"https://www.youtube.com/watch?v={course.id:06d}{v:05d}",
+                youtube_video_id=f"{course.id:06d}{v:05d}",
+                title=f"Video {v}",
+                position=v,
+            )
+            for course in course_rows
+            for v in range(videos_per_course)
+        ]
+        db.add_all(video_rows)
+        db.commit()
+
+        courses_of: Dict[int, List[int]] = {}
+        for course in course_rows:
+            courses_of.setdefault(course.user_id, []).append(course.id)
+        videos_of: Dict[int, List[int]] = {}
+        for video in video_rows:
+            videos_of.setdefault(video.course_id, []).append(video.id)
+
+        fixtures = {"users": []}
+        for user in user_rows:
+            courses = courses_of.get(user.id, [])
+            fixtures["users"].append({
+                "id": user.id,
+                "token": create_access_token({"sub": str(user.id)}),
+                "courses": courses,
+                "videos": [v for course_id in courses for v in videos_of[course_id]],
+            })
+        return fixtures
+    finally:
+        db.close()
+
+
+def set_passwords(password: str, rounds: int) -> List[str]:
+    """Give every seeded user the same real bcrypt hash and return their emails."""
+    from passlib.context import CryptContext
+    from database import SessionLocal
+    from models import User
+
+    password_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds).hash(password)
+    db = SessionLocal()
+    try:
+        db.query(User).update({User.password_hash: password_hash})
+        db.commit()
+        return [email for (email,) in db.query(User.email)]
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def app_client(app):
+    """Run the app's lifespan and yield an in-process HTTP client for it."""
+    import httpx
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float], elapsed: float) -> Dict:
+    """Throughput and latency percentiles (in milliseconds) for a set of timings."""
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+class Timer:
+    """Collect request latencies per label."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    @asynccontextmanager
+    async def measure(self, label: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(label, []).append(time.perf_counter() - start)
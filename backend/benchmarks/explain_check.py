@@ -0,0 +1,209 @@
+"""
+Check that hot queries use indexes on a large seeded dataset.
+
+Seeds a database, applies the migrations, refreshes planner statistics and
+runs EXPLAIN on the queries behind the busiest routes. Exits with status 1
+if any plan reads a whole table (a SQLite "SCAN" or a PostgreSQL "Seq
+Scan"), so it can gate CI or a deploy.
+
+Usage:
+    python benchmarks/explain_check.py
+    python benchmarks/explain_check.py --database-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+from datetime import datetime, timedelta
+
+from common import configure, seed
+
+
+def seed_activity(fixtures, timestamps_per_video, sessions_per_user):
+    """Add progress, timestamps and Pomodoro sessions for every seeded user."""
+    from sqlalchemy import insert
+    from database import SessionLocal
+    from models import PomodoroSession, Timestamp, Video, VideoProgress
+
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        course_of = dict(db.query(Video.id, Video.course_id))
+        progress, timestamps, sessions = [], [], []
+        for user in fixtures["users"]:
+            for video_id in user["videos"]:
+                progress.append({
+                    "user_id": user["id"], "video_id": video_id, "course_id": course_of[video_id],
+                    "last_timestamp": random.randint(0, 600), "completed": random.random() < 0.3,
+                    "created_at": now, "updated_at": now - timedelta(seconds=random.randint(0, 86400)),
+                })
+                timestamps.extend({
+                    "video_id": video_id, "user_id": user["id"], "time_seconds": random.uniform(0, 600),
+                    "label": f"Note {t}", "created_at": now, "updated_at": now,
+                } for t in range(timestamps_per_video))
+            sessions.extend({
+                "user_id": user["id"], "duration": 1500, "completed": random.random() < 0.7, "created_at": now,
+            } for _ in range(sessions_per_user))
+        db.execute(insert(VideoProgress), progress)
+        db.execute(insert(Timestamp), timestamps)
+        db.execute(insert(PomodoroSession), sessions)
+        db.commit()
+    finally:
+        db.close()
+
+
+def hot_queries(user_id, course_id, video_id):
+    """The statements behind the busiest routes, with realistic parameters."""
+    from sqlalchemy import and_, case, delete, func, select, tuple_, update
+    from models import Course, PomodoroSession, RefreshToken, Timestamp, Video, VideoProgress
+
+    return {
+        "GET /api/courses/": select(Course).where(Course.user_id == user_id).order_by(Course.id),
+        "GET /api/courses/?cursor=": (
+            select(Course).where(Course.user_id == user_id, Course.id > 0).order_by(Course.id).limit(51)
+        ),
+        "GET /api/courses/summary": (
+            select(
+                Course,
+                func.count(Video.id),
+                func.sum(case((VideoProgress.completed == True, 1), else_=0)),
+                func.max(VideoProgress.updated_at),
+            )
+            .outerjoin(Video, Video.course_id == Course.id)
+            .outerjoin(VideoProgress, and_(VideoProgress.video_id == Video.id, VideoProgress.user_id == user_id))
+            .where(Course.user_id == user_id)
+            .group_by(Course.id)
+        ),
+        "GET /api/courses/{id}": select(Video).where(Video.course_id == course_id).order_by(Video.position),
+        "GET /api/videos/course/{id}/list?cursor=": (
+            select(Video)
+            .where(Video.course_id == course_id, tuple_(Video.position, Video.id) > (1024, 0))
+            .order_by(Video.position, Video.id)
+            .limit(51)
+        ),
+        "GET /api/courses/{id}?include=progress": (
+            select(Course, Video, VideoProgress)
+            .outerjoin(Video, Video.course_id == Course.id)
+            .outerjoin(VideoProgress, and_(VideoProgress.video_id == Video.id, VideoProgress.user_id == user_id))
+            .where(Course.id == course_id)
+            .order_by(Video.position, Video.id)
+        ),
+        "GET /api/progress/course/{id}": select(VideoProgress).where(
+            VideoProgress.course_id == course_id, VideoProgress.user_id == user_id
+        ),
+        "POST /api/progress/video/{id}": select(VideoProgress).where(
+            VideoProgress.user_id == user_id, VideoProgress.video_id == video_id
+        ),
+        "POST /api/videos/{id}/reorder": (
+            select(Video.position)
+            .where(Video.course_id == course_id, Video.id != video_id)
+            .order_by(Video.position, Video.id)
+            .offset(5)
+            .limit(2)
+        ),
+        "DELETE /api/videos/{id}": delete(VideoProgress).where(VideoProgress.video_id == video_id),
+        "GET /api/timestamps/video/{id}": (
+            select(Timestamp)
+            .where(Timestamp.video_id == video_id, Timestamp.user_id == user_id)
+            .order_by(Timestamp.time_seconds, Timestamp.id)
+        ),
+        "GET /api/timestamps/video/{id}?cursor=": (
+            select(Timestamp)
+            .where(
+                Timestamp.video_id == video_id,
+                Timestamp.user_id == user_id,
+                tuple_(Timestamp.time_seconds, Timestamp.id) > (60.0, 0)
+            )
+            .order_by(Timestamp.time_seconds, Timestamp.id)
+            .limit(51)
+        ),
+        "pomodoro stats rebuild": (
+            select(PomodoroSession.user_id, func.count(PomodoroSession.id))
+            .where(PomodoroSession.user_id == user_id, PomodoroSession.completed == True)
+            .group_by(PomodoroSession.user_id)
+        ),
+        "POST /api/users/refresh": (
+            update(RefreshToken)
+            .where(RefreshToken.token_hash == "0" * 64, RefreshToken.revoked_at.is_(None))
+            .values(previous_hash=RefreshToken.token_hash)
+        ),
+    }
+
+
+def explain(conn, statement):
+    """Return (plan lines, full table scans) for one statement."""
+    compiled = statement.compile(dialect=conn.dialect)
+    if compiled.positiontup is not None:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled.string}", params).all()
+        lines = [row[-1] for row in rows]
+        scans = [line for line in lines if re.match(r"SCAN (?!CONSTANT ROW)", line)]
+        return lines, scans
+
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    lines, scans = [], []
+
+    def walk(node, depth):
+        line = "  " * depth + node["Node Type"] + (f" on {node['Relation Name']}" if "Relation Name" in node else "")
+        lines.append(line)
+        if node["Node Type"] == "Seq Scan":
+            scans.append(line.strip())
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    walk(plan[0]["Plan"], 0)
+    return lines, scans
+
+
+async def run(args):
+    configure(args.database_url)
+    fixtures = seed(args.users, args.courses, args.videos)
+    seed_activity(fixtures, args.timestamps, args.sessions)
+
+    from database import async_engine, engine
+    from migrations import migrate
+
+    await migrate(async_engine)
+    await async_engine.dispose()
+
+    user = random.choice(fixtures["users"])
+    queries = hot_queries(user["id"], random.choice(user["courses"]), random.choice(user["videos"]))
+
+    failures = 0
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        for name, statement in queries.items():
+            lines, scans = explain(conn, statement)
+            status = "FAIL" if scans else "ok"
+            failures += bool(scans)
+            print(f"[{status:>4}] {name}")
+            if scans or args.verbose:
+                for line in lines:
+                    print(f"         {line}")
+    print(f"{len(queries) - failures}/{len(queries)} hot queries use indexes")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to check (default: temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--courses", type=int, default=3, help="Courses per user")
+    parser.add_argument("--videos", type=int, default=30, help="Videos per course")
+    parser.add_argument("--timestamps", type=int, default=2, help="Timestamps per user and video")
+    parser.add_argument("--sessions", type=int, default=20, help="Pomodoro sessions per user")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan")
+    failures = asyncio.run(run(parser.parse_args()))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Concurrent heartbeat and course-detail load test.
+
+Runs the API in-process against a seeded database and drives it with a
+number of simulated learners. Each learner sends progress heartbeats and
+now and then reopens a course. Throughput and latency are reported for
+every concurrency level, so runs on different commits can be compared.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 1,16,64 --duration 10
+    python benchmarks/load_test.py --database-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from common import Timer, app_client, configure, seed, summarize
+
+
+async def learner(client, user, timer, deadline, detail_every):
+    headers = {"Authorization": f"Bearer {user['token']}"}
+    requests_sent = 0
+    while time.perf_counter() < deadline:
+        if requests_sent % detail_every == 0:
+            course_id = random.choice(user["courses"])
+            async with timer.measure("course_detail"):
+                response = await client.get(f"/api/courses/{course_id}", headers=headers)
+        else:
+            video_id = random.choice(user["videos"])
+            async with timer.measure("heartbeat"):
+                response = await client.post(
+                    f"/api/progress/video/{video_id}",
+                    json={"last_timestamp": requests_sent},
+                    headers=headers,
+                )
+        response.raise_for_status()
+        requests_sent += 1
+
+
+async def run(args):
+    configure(args.database_url)
+    fixtures = seed(args.users, args.courses, args.videos)
+
+    from main import app
+
+    async with app_client(app) as client:
+        print(f"{'concurrency':>11} {'route':<14} {'requests':>9} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for concurrency in args.concurrency:
+            timer = Timer()
+            start = time.perf_counter()
+            deadline = start + args.duration
+            await asyncio.gather(*[
+                learner(client, fixtures["users"][i % len(fixtures["users"])], timer, deadline, args.detail_every)
+                for i in range(concurrency)
+            ])
+            elapsed = time.perf_counter() - start
+
+            everything = [s for samples in timer.samples.values() for s in samples]
+            for route, samples in sorted(timer.samples.items()) + [("total", everything)]:
+                stats = summarize(samples, elapsed)
+                print(
+                    f"{concurrency:>11} {route:<14} {stats['requests']:>9} {stats['rps']:>9} "
+                    f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to benchmark against (default: temporary SQLite file)")
+    parser.add_argument("--concurrency", default="1,8,32", type=lambda v: [int(c) for c in v.split(",")])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per concurrency level")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--courses", type=int, default=3, help="Courses per user")
+    parser.add_argument("--videos", type=int, default=30, help="Videos per course")
+    parser.add_argument("--detail-every", type=int, default=10, help="One course open per N requests")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
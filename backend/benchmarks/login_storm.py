@@ -0,0 +1,114 @@
+"""
+Login throughput and heartbeat latency during a login storm.
+
+Runs the API in-process with simulated learners sending progress
+heartbeats, first on their own and then while a number of clients log in
+back to back. Reports logins per second (and per core of the hashing
+pool) and heartbeat latency for each phase. --inline adds a phase with
+bcrypt running directly on the event loop, as login did before hashing
+moved to its own pool.
+
+Usage:
+    python benchmarks/login_storm.py --rounds 12 --login-clients 16 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from common import Timer, app_client, configure, seed, set_passwords, summarize
+
+PASSWORD = "benchmark-password"
+
+
+async def learner(client, user, timer, deadline):
+    headers = {"Authorization": f"Bearer {user['token']}"}
+    beat = 0
+    while time.perf_counter() < deadline:
+        video_id = random.choice(user["videos"])
+        async with timer.measure("heartbeat"):
+            response = await client.post(
+                f"/api/progress/video/{video_id}", json={"last_timestamp": beat}, headers=headers
+            )
+        response.raise_for_status()
+        beat += 1
+        await asyncio.sleep(0.01)
+
+
+async def login_client(client, emails, timer, deadline):
+    while time.perf_counter() < deadline:
+        async with timer.measure("login"):
+            response = await client.post(
+                "/api/users/login", json={"email": random.choice(emails), "password": PASSWORD}
+            )
+        response.raise_for_status()
+
+
+def run_inline():
+    """Make login hash and verify on the event loop, like the pre-pool code."""
+    import routes_users
+    from auth import pwd_context
+
+    async def verify_password(plain_password, hashed_password):
+        return pwd_context.verify(plain_password, hashed_password)
+
+    routes_users.verify_password = verify_password
+
+
+async def run_phase(client, fixtures, emails, args, login_clients, duration):
+    timer = Timer()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(
+        *[learner(client, fixtures["users"][i % len(fixtures["users"])], timer, deadline) for i in range(args.learners)],
+        *[login_client(client, emails, timer, deadline) for _ in range(login_clients)],
+    )
+    return timer, time.perf_counter() - start
+
+
+async def run(args):
+    configure(args.database_url)
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    fixtures = seed(args.users, 1, 10)
+    emails = set_passwords(PASSWORD, args.rounds)
+
+    from auth import PASSWORD_HASH_WORKERS
+    from main import app
+
+    phases = [("baseline", 0), ("storm", args.login_clients)]
+    if args.inline:
+        phases.append(("storm-inline", args.login_clients))
+
+    print(f"bcrypt rounds {args.rounds}, hashing pool of {PASSWORD_HASH_WORKERS}, {os.cpu_count()} cpus")
+    print(f"{'phase':<13} {'logins/s':>9} {'per core':>9} {'hb p50 ms':>10} {'hb p99 ms':>10} {'login p99 ms':>13}")
+    async with app_client(app) as client:
+        # Warm up connections and caches before measuring
+        await run_phase(client, fixtures, emails, args, 1, 1.0)
+        for name, login_clients in phases:
+            if name == "storm-inline":
+                run_inline()
+            timer, elapsed = await run_phase(client, fixtures, emails, args, login_clients, args.duration)
+            heartbeats = summarize(timer.samples.get("heartbeat", []), elapsed)
+            logins = summarize(timer.samples.get("login", []), elapsed)
+            cores = 1 if name == "storm-inline" else min(PASSWORD_HASH_WORKERS, os.cpu_count() or 1)
+            print(
+                f"{name:<13} {logins['rps']:>9} {logins['rps'] / cores:>9.1f} "
+                f"{heartbeats['p50_ms']:>10} {heartbeats['p99_ms']:>10} {logins['p99_ms']:>13}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to benchmark against (default: temporary SQLite file)")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per phase")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--learners", type=int, default=8, help="Clients sending heartbeats")
+    parser.add_argument("--login-clients", type=int, default=8, help="Clients logging in back to back")
+    parser.add_argument("--inline", action="store_true", help="Also run the storm with bcrypt on the event loop")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
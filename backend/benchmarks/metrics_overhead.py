@@ -0,0 +1,75 @@
+"""
+Per-request cost of the metrics middleware.
+
+Serves a trivial route from a bare FastAPI app with and without
+MetricsMiddleware and reports the time per request, then times a single
+histogram observation. The difference is what every heartbeat pays for
+being measured.
+
+Usage:
+    python benchmarks/metrics_overhead.py --requests 5000 --rounds 3
+"""
+import argparse
+import asyncio
+import time
+import timeit
+
+from common import app_client, configure
+
+
+def build_app(with_metrics):
+    from fastapi import FastAPI
+    from metrics import MetricsMiddleware
+
+    app = FastAPI()
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+
+    @app.post("/api/progress/video/{video_id}")
+    async def heartbeat(video_id: int):
+        return {"video_id": video_id}
+
+    return app
+
+
+async def time_requests(app, requests):
+    async with app_client(app) as client:
+        for i in range(200):  # warm up
+            await client.post(f"/api/progress/video/{i}")
+        start = time.perf_counter()
+        for i in range(requests):
+            await client.post(f"/api/progress/video/{i}")
+        return (time.perf_counter() - start) / requests
+
+
+async def run(args):
+    configure()
+    from metrics import Histogram
+
+    # Alternate the two apps and keep each one's best round to cancel out drift
+    results = {"none": float("inf"), "metrics": float("inf")}
+    for _ in range(args.rounds):
+        for label, with_metrics in (("none", False), ("metrics", True)):
+            results[label] = min(results[label], await time_requests(build_app(with_metrics), args.requests))
+
+    print(f"{'middleware':<12} {'us/request':>11}")
+    for label, seconds in results.items():
+        print(f"{label:<12} {seconds * 1e6:>11.1f}")
+    print(f"overhead     {(results['metrics'] - results['none']) * 1e6:>11.1f}")
+
+    histogram = Histogram("bench_seconds", "Benchmark histogram", ["method", "route"])
+    per_observe = timeit.timeit(
+        lambda: histogram.observe(0.003, "POST", "/api/progress/video/{video_id}"), number=200000
+    ) / 200000
+    print(f"\nhistogram observe: {per_observe * 1e6:.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per round")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds per app; the best one counts")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
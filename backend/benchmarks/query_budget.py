@@ -0,0 +1,155 @@
+"""
+Check that endpoints stay within their SQL statement budgets.
+
+Seeds a database, then calls each endpoint once through the in-process app
+inside assert_query_budget with the budget pinned below, and flushes the
+progress buffer under a budget of its own. Prints the statements each one
+ran and exits with status 1 if any check went over, so a change that adds
+queries to a hot path (an N+1 loop, a lazy load, a forgotten join) fails
+CI. Lower a budget when an endpoint gets cheaper.
+
+Usage:
+    python benchmarks/query_budget.py
+    python benchmarks/query_budget.py --database-url postgresql://user:pw@localhost/bench --verbose
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from common import app_client, configure, seed, set_passwords
+
+PASSWORD = "benchmark-password"
+
+# (method, path, budget); {course}, {video}, {share}, {timestamp} and
+# {new_video} are filled in from the seeded data. Budgets are for the steady
+# state: heartbeats are buffered and progress reads served from the buffer,
+# so they run no statements at all. The first heartbeat for a video writes
+# through ({new_video}), and the buffer's flush has a budget of its own
+# (FLUSH_BUDGET), so the write path is measured too.
+BUDGETS = [
+    ("POST", "/api/users/login", 3),
+    ("GET", "/api/courses/", 1),
+    ("GET", "/api/courses/?limit=2", 1),
+    ("GET", "/api/courses/summary", 1),
+    ("GET", "/api/courses/{course}", 2),
+    ("GET", "/api/courses/{course}?include=progress", 1),
+    ("GET", "/api/courses/share/{share}", 2),
+    ("GET", "/api/videos/course/{course}/list", 2),
+    ("GET", "/api/videos/course/{course}/list?limit=5", 2),
+    ("POST", "/api/progress/video/{new_video}", 1),
+    ("POST", "/api/progress/video/{video}", 0),
+    ("GET", "/api/progress/video/{video}", 0),
+    ("GET", "/api/progress/course/{course}", 2),
+    ("POST", "/api/timestamps/", 3),
+    ("GET", "/api/timestamps/video/{video}", 2),
+    ("PUT", "/api/timestamps/{timestamp}", 2),
+    ("DELETE", "/api/timestamps/{timestamp}", 2),
+    ("GET", "/api/progress/pomodoro/stats", 1),
+]
+
+# Statements to write back every buffered heartbeat: one bulk UPDATE per
+# PROGRESS_FLUSH_BATCH_SIZE rows
+FLUSH_BUDGET = 1
+
+
+def request_body(method, path, ids, email):
+    if path == "/api/users/login":
+        return {"email": email, "password": PASSWORD}
+    if path.startswith("/api/progress/video/") and method == "POST":
+        return {"last_timestamp": 42}
+    if path == "/api/timestamps/":
+        return {"video_id": ids["video"], "time_seconds": 12.5, "label": "Budget check"}
+    if method == "PUT":
+        return {"label": "Renamed"}
+    return None
+
+
+async def run(args):
+    configure(args.database_url)
+    # Match the seeded hash so login doesn't upgrade it
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    fixtures = seed(1, 2, args.videos)
+    email = set_passwords(PASSWORD, 4)[0]
+    user = fixtures["users"][0]
+
+    from main import app
+    from progress_buffer import progress_buffer
+    from sql_profiler import QueryBudgetExceeded, assert_query_budget
+
+    headers = {"Authorization": f"Bearer {user['token']}"}
+    ids = {"course": user["courses"][0], "video": user["videos"][0], "new_video": user["videos"][1]}
+    failures = 0
+
+    async with app_client(app) as client:
+        response = await client.post(f"/api/courses/{ids['course']}/share", headers=headers)
+        ids["share"] = response.json()["share_token"]
+        # Seed progress and a timestamp so the reads return rows, and load
+        # the caches every request after the first one benefits from
+        await client.post(f"/api/progress/video/{ids['video']}", json={"last_timestamp": 1}, headers=headers)
+        response = await client.post(
+            "/api/timestamps/", json={"video_id": ids["video"], "time_seconds": 1, "label": "Seed"}, headers=headers
+        )
+        ids["timestamp"] = response.json()["id"]
+        await client.get("/api/progress/pomodoro/stats", headers=headers)
+
+        print(f"{'endpoint':<50} {'statements':>10} {'budget':>7}")
+        for method, template, budget in BUDGETS:
+            path = template.format(**ids)
+            label = f"{method} {template}"
+            try:
+                with assert_query_budget(budget, label) as profiles:
+                    response = await client.request(
+                        method, path, json=request_body(method, template, ids, email), headers=headers
+                    )
+                status = "ok"
+            except QueryBudgetExceeded as exc:
+                status = "OVER"
+                failures += 1
+                profiles = exc.profiles
+                details = str(exc)
+            if response.status_code >= 400:
+                status, failures = f"HTTP {response.status_code}", failures + 1
+            used = max((profile.statements for profile in profiles), default=0)
+            print(f"{label:<50} {used:>10} {budget:>7}  {status}")
+            if status == "OVER":
+                print(details)
+            elif args.verbose:
+                for profile in profiles:
+                    for shape, count in profile.shapes.items():
+                        print(f"    {count} x {' '.join(shape.split())[:150]}")
+
+        # Dirty several buffered rows, then write them back as the flush loop would
+        for video_id in user["videos"][:5]:
+            await client.post(f"/api/progress/video/{video_id}", json={"last_timestamp": 7}, headers=headers)
+            await client.post(f"/api/progress/video/{video_id}", json={"last_timestamp": 8}, headers=headers)
+        label = "progress buffer flush"
+        try:
+            with assert_query_budget(FLUSH_BUDGET, label) as profiles:
+                flushed = await progress_buffer.flush()
+            status = f"ok ({flushed} rows)" if flushed else "nothing flushed"
+            failures += not flushed
+        except QueryBudgetExceeded as exc:
+            status, details, profiles = "OVER", str(exc), exc.profiles
+            failures += 1
+        used = max((profile.statements for profile in profiles), default=0)
+        print(f"{label:<50} {used:>10} {FLUSH_BUDGET:>7}  {status}")
+        if status == "OVER":
+            print(details)
+
+    checks = len(BUDGETS) + 1
+    print(f"{checks - failures}/{checks} checks within budget")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to check (default: temporary SQLite file)")
+    parser.add_argument("--videos", type=int, default=20, help="Videos per course")
+    parser.add_argument("--verbose", action="store_true", help="Print every endpoint's statements")
+    failures = asyncio.run(run(parser.parse_args()))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Serialization cost of large list responses.
+
+Builds 10k in-memory Video rows and serves them from three routes of a
+bare FastAPI app, so only the response path is measured:
+
+  response_model  from_orm per row, then FastAPI validates, encodes and
+                  json.dumps the list again (how list routes used to work)
+  orjson          the same, rendered by ORJSONResponse
+  type_adapter    one TypeAdapter pass straight to JSON bytes (fast_json)
+
+Usage:
+    python benchmarks/serialization.py --rows 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import List
+
+from common import app_client, configure, percentile
+
+
+def build_app(rows):
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fast_json import json_response, list_adapter
+    from schemas import VideoResponse
+
+    video_list = list_adapter(VideoResponse)
+    app = FastAPI()
+
+    @app.get("/response_model", response_model=List[VideoResponse], response_class=JSONResponse)
+    async def response_model():
+        return [VideoResponse.from_orm(row) for row in rows]
+
+    @app.get("/orjson", response_model=List[VideoResponse], response_class=ORJSONResponse)
+    async def orjson():
+        return [VideoResponse.from_orm(row) for row in rows]
+
+    @app.get("/type_adapter", response_model=List[VideoResponse])
+    async def type_adapter():
+        return json_response(video_list, rows)
+
+    return app
+
+
+async def run(args):
+    configure()
+    from models import Video
+
+    now = datetime.utcnow()
+    rows = [
+        Video(
+            id=i, course_id=1, youtube_url=f"https://www.youtube.com/watch?v={i:011d}",
+            youtube_video_id=f"{i:011d}", title=f"Video {i}", description="A video description " * 5,
+            position=i * 1024, duration=600, created_at=now,
+        )
+        for i in range(args.rows)
+    ]
+
+    app = build_app(rows)
+    print(f"{'path':<16} {'rows':>7} {'p50 ms':>8} {'p95 ms':>8} {'bytes':>10}")
+    async with app_client(app) as client:
+        bodies = {}
+        for path in ("response_model", "orjson", "type_adapter"):
+            await client.get(f"/{path}")  # warm up
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                response = await client.get(f"/{path}")
+                samples.append(time.perf_counter() - start)
+            response.raise_for_status()
+            bodies[path] = response.json()
+            print(
+                f"{path:<16} {args.rows:>7} {percentile(samples, 50) * 1000:>8.1f} "
+                f"{percentile(samples, 95) * 1000:>8.1f} {len(response.content):>10}"
+            )
+    assert bodies["response_model"] == bodies["orjson"] == bodies["type_adapter"], "responses differ"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="Rows per response")
+    parser.add_argument("--repeat", type=int, default=20, help="Requests per path")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
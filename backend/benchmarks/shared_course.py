@@ -0,0 +1,67 @@
+"""
+Throughput of public shared-course pages with and without the page cache.
+
+Seeds one course, shares it, and has anonymous clients fetch the shared
+page back to back. The run is repeated with the shared-course cache
+disabled (every request queries the database and serializes the course;
+only exactly concurrent misses are merged) and enabled.
+
+Usage:
+    python benchmarks/shared_course.py --concurrency 32 --videos 50 --duration 5
+"""
+import argparse
+import asyncio
+import time
+
+from common import Timer, app_client, configure, seed, summarize
+
+
+async def visitor(client, url, timer, deadline):
+    while time.perf_counter() < deadline:
+        async with timer.measure("shared"):
+            response = await client.get(url)
+        response.raise_for_status()
+
+
+async def run(args):
+    configure(args.database_url)
+    fixtures = seed(1, 1, args.videos)
+    user = fixtures["users"][0]
+
+    from course_cache import shared_course_cache
+    from main import app
+
+    async with app_client(app) as client:
+        response = await client.post(
+            f"/api/courses/{user['courses'][0]}/share",
+            headers={"Authorization": f"Bearer {user['token']}"},
+        )
+        response.raise_for_status()
+        url = f"/api/courses/share/{response.json()['share_token']}"
+
+        print(f"{'cache':<10} {'requests':>9} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for label, max_entries in (("disabled", 0), ("enabled", shared_course_cache.max_entries)):
+            shared_course_cache.clear()
+            shared_course_cache.max_entries = max_entries
+            timer = Timer()
+            start = time.perf_counter()
+            deadline = start + args.duration
+            await asyncio.gather(*[visitor(client, url, timer, deadline) for _ in range(args.concurrency)])
+            stats = summarize(timer.samples["shared"], time.perf_counter() - start)
+            print(
+                f"{label:<10} {stats['requests']:>9} {stats['rps']:>9} "
+                f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to benchmark against (default: temporary SQLite file)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per run")
+    parser.add_argument("--videos", type=int, default=50, help="Videos in the shared course")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
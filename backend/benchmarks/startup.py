@@ -0,0 +1,214 @@
+"""
+Measure how long a worker takes to start and serve its first request.
+
+Every run is a fresh Python process, as a new uvicorn or gunicorn worker
+would be. Each run reports the time to import main, the time for the
+lifespan to start, and how long the first /health (liveness) and /ready
+(readiness) requests take. The process spawn time, interpreter start
+included, is reported too. By default the database is migrated once up
+front. With --auto-migrate every run starts from an empty database and
+AUTO_MIGRATE applies the migrations during startup. Before the timed runs,
+main is imported against a database file that does not exist yet, to check
+that importing it creates nothing.
+
+--server starts real uvicorn processes instead and polls them over HTTP.
+It needs uvicorn installed. --breakdown lists the slowest imports
+according to python -X importtime.
+
+Usage:
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --auto-migrate --breakdown 15
+    python benchmarks/startup.py --server --database-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import BACKEND_DIR, percentile
+
+
+def fresh_sqlite_url() -> str:
+    path = os.path.join(tempfile.mkdtemp(prefix="onestop-startup-"), "startup.sqlite")
+    return f"sqlite:///{path}"
+
+
+def sqlite_path(database_url: str):
+    return database_url.split("///", 1)[1] if database_url.startswith("sqlite") else None
+
+
+def child_env(database_url: str, auto_migrate: bool) -> dict:
+    return {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "AUTO_MIGRATE": "true" if auto_migrate else "false",
+    }
+
+
+def run_child(database_url: str, auto_migrate: bool, *extra: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", *extra],
+        cwd=BACKEND_DIR, env=child_env(database_url, auto_migrate), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"startup run failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def child(import_only: bool) -> None:
+    """Runs in the measured process: import, start up, serve the first requests."""
+    start = time.perf_counter()
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+    imported = time.perf_counter()
+    timings = {"import_s": imported - start}
+
+    if not import_only:
+        import httpx
+
+        async def first_requests():
+            async with main.app.router.lifespan_context(main.app):
+                started = time.perf_counter()
+                timings["lifespan_s"] = started - imported
+                transport = httpx.ASGITransport(app=main.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                    for path in ("/health", "/ready"):
+                        before = time.perf_counter()
+                        response = await client.get(path)
+                        timings[f"{path[1:]}_s"] = time.perf_counter() - before
+                        timings[f"{path[1:]}_status"] = response.status_code
+                timings["first_ready_s"] = time.perf_counter() - start
+
+        asyncio.run(first_requests())
+    # Everything else in stdout is the app's own output
+    print(json.dumps(timings))
+
+
+def migrate(database_url: str) -> None:
+    subprocess.run(
+        [sys.executable, "manage.py", "migrate"], cwd=BACKEND_DIR,
+        env=child_env(database_url, False), check=True, capture_output=True
+    )
+
+
+def check_import_side_effects() -> None:
+    database_url = fresh_sqlite_url()
+    run_child(database_url, False, "--import-only")
+    created = os.path.exists(sqlite_path(database_url))
+    print(f"importing main created the database file: {'yes' if created else 'no'}")
+
+
+def in_process_runs(args) -> dict:
+    database_url = args.database_url
+    if database_url is None and not args.auto_migrate:
+        database_url = fresh_sqlite_url()
+    if database_url is not None:
+        migrate(database_url)
+
+    samples = {}
+    for _ in range(args.runs):
+        before = time.perf_counter()
+        timings = run_child(database_url or fresh_sqlite_url(), args.auto_migrate)
+        timings["process_s"] = time.perf_counter() - before
+        if timings["ready_status"] != 200:
+            sys.exit(f"/ready answered {timings['ready_status']}")
+        for key, value in timings.items():
+            if key.endswith("_s"):
+                samples.setdefault(key, []).append(value)
+    return samples
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float) -> float:
+    """Poll url until it answers 200; returns when it did."""
+    import httpx
+
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    sys.exit(f"{url} did not become ready")
+
+
+def server_runs(args) -> dict:
+    database_url = args.database_url or fresh_sqlite_url()
+    if not args.auto_migrate:
+        migrate(database_url)
+
+    samples = {}
+    for _ in range(args.runs):
+        if args.auto_migrate and args.database_url is None:
+            database_url = fresh_sqlite_url()
+        port = free_port()
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=child_env(database_url, args.auto_migrate),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            live = wait_for(f"http://127.0.0.1:{port}/health", start + 60)
+            ready = wait_for(f"http://127.0.0.1:{port}/ready", start + 60)
+        finally:
+            server.terminate()
+            server.wait()
+        samples.setdefault("first_health_s", []).append(live - start)
+        samples.setdefault("first_ready_s", []).append(ready - start)
+    return samples
+
+
+def breakdown(args) -> None:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR,
+        env=child_env(args.database_url or fresh_sqlite_url(), False), capture_output=True, text=True
+    )
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    print("\nslowest imports (cumulative, nested modules indented)")
+    for cumulative, module in sorted(rows, reverse=True)[:args.breakdown]:
+        print(f"{cumulative / 1000:>9.1f} ms {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to start against (default: temporary SQLite files)")
+    parser.add_argument("--runs", type=int, default=5, help="Processes to start")
+    parser.add_argument("--auto-migrate", action="store_true", help="Migrate during startup instead of up front")
+    parser.add_argument("--server", action="store_true", help="Time real uvicorn processes over HTTP")
+    parser.add_argument("--breakdown", type=int, default=0, help="Also list this many of the slowest imports")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--import-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.import_only)
+        return
+
+    check_import_side_effects()
+    samples = server_runs(args) if args.server else in_process_runs(args)
+    print(f"{'phase':<16} {'p50 ms':>8} {'max ms':>8}")
+    for key, values in samples.items():
+        print(f"{key[:-2]:<16} {percentile(values, 50) * 1000:>8.1f} {max(values) * 1000:>8.1f}")
+    if args.breakdown:
+        breakdown(args)
+
+
+if __name__ == "__main__":
+    main()
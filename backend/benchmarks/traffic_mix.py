@@ -0,0 +1,258 @@
+"""
+Replay a realistic traffic mix and report latency per route.
+
+Runs the API in-process against a seeded database (a temporary SQLite file,
+or a local Postgres with --database-url) and simulates learners. Each
+learner session logs in, opens a course with its progress and lists the
+current video's timestamps, then watches: one progress heartbeat every
+--heartbeat-interval seconds, now and then adding, renaming or deleting a
+timestamp and moving on to another video. After --session-heartbeats
+heartbeats the learner starts a new session.
+
+Heartbeats are paced, not sent back to back, and their latency is measured
+from when they were due, so a slow server cannot hide its backlog.
+Throughput and p50/p95/p99 latency are reported per route and, with
+--output, saved as JSON together with the commit and settings. --compare
+prints the change against an earlier results file.
+
+Usage:
+    python benchmarks/traffic_mix.py --learners 100 --duration 60 --output results/$(git rev-parse --short HEAD).json
+    python benchmarks/traffic_mix.py --database-url postgresql://user:pw@localhost/bench --compare results/main.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from common import BACKEND_DIR, app_client, configure, seed, set_passwords, summarize
+
+PASSWORD = "benchmark-password"
+
+
+class Recorder:
+    """Latencies and failed requests per route, ignoring the warm-up."""
+
+    def __init__(self, record_from: float):
+        self.record_from = record_from
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    async def request(self, client, route: str, method: str, url: str, due: Optional[float] = None, **kwargs):
+        start = due if due is not None else time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        if start >= self.record_from:
+            self.samples.setdefault(route, []).append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                self.errors[route] = self.errors.get(route, 0) + 1
+        return response
+
+
+async def open_video(client, recorder, headers, video_id):
+    response = await recorder.request(
+        client, "GET /api/timestamps/video/{id}", "GET", f"/api/timestamps/video/{video_id}", headers=headers
+    )
+    return [t["id"] for t in response.json()] if response.status_code == 200 else []
+
+
+async def watch(client, recorder, headers, videos, args, rng, deadline):
+    """Heartbeats and timestamp edits for one session; False once the run is over."""
+    video_id = rng.choice(videos)
+    timestamps = await open_video(client, recorder, headers, video_id)
+    position = 0
+    due = time.perf_counter()
+
+    for _ in range(args.session_heartbeats):
+        due += args.heartbeat_interval
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        if due >= deadline:
+            return False
+
+        position += round(args.heartbeat_interval)
+        await recorder.request(
+            client, "POST /api/progress/video/{id}", "POST", f"/api/progress/video/{video_id}",
+            due=due, json={"last_timestamp": position}, headers=headers
+        )
+
+        roll = rng.random()
+        if roll < args.timestamp_rate:
+            response = await recorder.request(
+                client, "POST /api/timestamps/", "POST", "/api/timestamps/",
+                json={"video_id": video_id, "time_seconds": position, "label": f"Note at {position}s"},
+                headers=headers
+            )
+            if response.status_code == 200:
+                timestamps.append(response.json()["id"])
+        elif roll < args.timestamp_rate * 1.5 and timestamps:
+            await recorder.request(
+                client, "PUT /api/timestamps/{id}", "PUT", f"/api/timestamps/{rng.choice(timestamps)}",
+                json={"label": "Renamed note"}, headers=headers
+            )
+        elif roll < args.timestamp_rate * 2 and timestamps:
+            timestamp_id = timestamps.pop(rng.randrange(len(timestamps)))
+            await recorder.request(
+                client, "DELETE /api/timestamps/{id}", "DELETE", f"/api/timestamps/{timestamp_id}", headers=headers
+            )
+
+        if rng.random() < 1 / args.video_heartbeats:
+            video_id = rng.choice(videos)
+            timestamps = await open_video(client, recorder, headers, video_id)
+            position = 0
+    return True
+
+
+async def learner(client, recorder, user, email, args, deadline, rng):
+    # Spread learners over one heartbeat interval so they don't move in lockstep
+    await asyncio.sleep(rng.uniform(0, args.heartbeat_interval))
+    while time.perf_counter() < deadline:
+        response = await recorder.request(
+            client, "POST /api/users/login", "POST", "/api/users/login",
+            json={"email": email, "password": PASSWORD}
+        )
+        if response.status_code != 200:
+            await asyncio.sleep(args.heartbeat_interval)
+            continue
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        course_id = rng.choice(user["courses"])
+        response = await recorder.request(
+            client, "GET /api/courses/{id}?include=progress", "GET", f"/api/courses/{course_id}",
+            params={"include": "progress"}, headers=headers
+        )
+        videos = [v["id"] for v in response.json()["videos"]] if response.status_code == 200 else []
+        if not videos:
+            await asyncio.sleep(args.heartbeat_interval)
+            continue
+
+        if not await watch(client, recorder, headers, videos, args, rng, deadline):
+            return
+
+
+def git_revision():
+    """(commit, dirty) of the backend checkout, or (None, None) outside git."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def print_results(results):
+    print(f"{'route':<40} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, stats in list(results["routes"].items()) + [("total", results["total"])]:
+        print(
+            f"{route:<40} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>8} "
+            f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}"
+        )
+
+
+def print_comparison(results, baseline):
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+
+    print(f"\nagainst {(baseline.get('commit') or 'unknown')[:12]} ({baseline.get('started_at', '?')})")
+    print(f"{'route':<40} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, stats in list(results["routes"].items()) + [("total", results["total"])]:
+        old = baseline["total"] if route == "total" else baseline["routes"].get(route)
+        if old is None:
+            print(f"{route:<40} {'new route':>8}")
+            continue
+        print(
+            f"{route:<40} {change(stats['rps'], old['rps']):>8} {change(stats['p50_ms'], old['p50_ms']):>8} "
+            f"{change(stats['p95_ms'], old['p95_ms']):>8} {change(stats['p99_ms'], old['p99_ms']):>8}"
+        )
+
+
+async def run(args):
+    database_url = configure(args.database_url)
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    fixtures = seed(args.users, args.courses, args.videos)
+    set_passwords(PASSWORD, args.rounds)
+
+    from database import SessionLocal
+    from main import app
+    from models import User
+
+    db = SessionLocal()
+    try:
+        emails = dict(db.query(User.id, User.email))
+    finally:
+        db.close()
+
+    rng = random.Random(args.seed)
+    started_at = datetime.utcnow().isoformat(timespec="seconds")
+    start = time.perf_counter()
+    recorder = Recorder(record_from=start + args.warmup)
+    deadline = start + args.warmup + args.duration
+
+    async with app_client(app) as client:
+        await asyncio.gather(*[
+            learner(client, recorder, user, emails[user["id"]], args, deadline, random.Random(rng.random()))
+            for user in (fixtures["users"][i % len(fixtures["users"])] for i in range(args.learners))
+        ])
+
+    elapsed = args.duration
+    routes = {}
+    for route in sorted(recorder.samples):
+        routes[route] = {**summarize(recorder.samples[route], elapsed), "errors": recorder.errors.get(route, 0)}
+    everything = [s for samples in recorder.samples.values() for s in samples]
+
+    commit, dirty = git_revision()
+    settings = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "database_url")}
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "started_at": started_at,
+        "database": database_url.split(":", 1)[0],
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": settings,
+        "routes": routes,
+        "total": {**summarize(everything, elapsed), "errors": sum(recorder.errors.values())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to benchmark against (default: temporary SQLite file)")
+    parser.add_argument("--learners", type=int, default=50, help="Concurrent simulated learners")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds run before measuring")
+    parser.add_argument("--heartbeat-interval", type=float, default=3.0, help="Seconds between heartbeats")
+    parser.add_argument("--session-heartbeats", type=int, default=20, help="Heartbeats before logging in again")
+    parser.add_argument("--video-heartbeats", type=float, default=10, help="Mean heartbeats per video")
+    parser.add_argument("--timestamp-rate", type=float, default=0.05, help="Chance of adding a timestamp per heartbeat")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--courses", type=int, default=3, help="Courses per user")
+    parser.add_argument("--videos", type=int, default=30, help="Videos per course")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the traffic")
+    parser.add_argument("--output", help="Save results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nsaved to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
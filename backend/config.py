@@ -0,0 +1,9 @@
+"""
+Process-wide environment loading.
+
+Modules that read settings from the environment import this first, so the
+.env file is read once per process instead of once per module.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
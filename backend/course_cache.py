@@ -0,0 +1,170 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import Response, status
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import config  # noqa: F401  (loads .env)
+from metrics import register_cache
+from models import Course
+
+# Shared-course cache configuration
+SHARED_COURSE_CACHE_TTL_SECONDS = float(os.getenv("SHARED_COURSE_CACHE_TTL_SECONDS", "60"))
+SHARED_COURSE_CACHE_MAX_ENTRIES = int(os.getenv("SHARED_COURSE_CACHE_MAX_ENTRIES", "1000"))
+
+# Cache headers for course representations: browsers keep them but always
+# revalidate with If-None-Match
+COURSE_CACHE_CONTROL = "private, no-cache"
+
+
+@dataclass
+class SharedCoursePage:
+    """Serialized shared-course response."""
+    course_id: int
+    etag: str
+    body: bytes
+    expires_at: float = 0.0
+
+
+class SharedCourseCache:
+    """
+    In-process TTL cache of serialized shared-course pages, keyed by share token.
+
+    Concurrent misses for the same token share one load. Entries are dropped
+    when their course changes (see bump_course_version); a load that was
+    already running when an invalidation happened is returned to its callers
+    but not stored, so it cannot reinstate stale data.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = SHARED_COURSE_CACHE_TTL_SECONDS,
+        max_entries: int = SHARED_COURSE_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, SharedCoursePage]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get(
+        self,
+        share_token: str,
+        load: Callable[[], Awaitable[Optional[SharedCoursePage]]]
+    ) -> Optional[SharedCoursePage]:
+        """Return the cached page, calling load (once for all waiters) on a miss."""
+        page = self._entries.get(share_token)
+        if page is not None:
+            if page.expires_at > time.monotonic():
+                self._entries.move_to_end(share_token)
+                self.hits += 1
+                return page
+            del self._entries[share_token]
+        self.misses += 1
+
+        task = self._inflight.get(share_token)
+        if task is None:
+            task = asyncio.ensure_future(self._fill(share_token, load))
+            self._inflight[share_token] = task
+            task.add_done_callback(lambda _: self._inflight.pop(share_token, None))
+        # A cancelled caller must not cancel the load for everyone else
+        return await asyncio.shield(task)
+
+    async def _fill(
+        self,
+        share_token: str,
+        load: Callable[[], Awaitable[Optional[SharedCoursePage]]]
+    ) -> Optional[SharedCoursePage]:
+        invalidations = self._invalidations
+        page = await load()
+        if page is not None and invalidations == self._invalidations and self.max_entries > 0:
+            page.expires_at = time.monotonic() + self.ttl_seconds
+            self._entries[share_token] = page
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return page
+
+    def invalidate_course(self, course_id: int) -> None:
+        """Drop the cached page of a course."""
+        self._invalidations += 1
+        for token in [t for t, page in self._entries.items() if page.course_id == course_id]:
+            del self._entries[token]
+
+    def clear(self) -> None:
+        self._invalidations += 1
+        self._entries.clear()
+
+
+# Initialize shared-course cache
+shared_course_cache = SharedCourseCache()
+register_cache("shared_course", shared_course_cache)
+
+
+async def bump_course_version(db: AsyncSession, course_id: int) -> None:
+    """
+    Mark a course as changed; the caller commits.
+
+    Every mutation of a course, its videos or their order must call this so
+    cached representations (and their ETags) are invalidated. The
+    shared-course cache is cleared now and again once the transaction
+    commits.
+    """
+    await db.execute(
+        update(Course)
+        .where(Course.id == course_id)
+        .values(version=Course.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    mark_course_changed(db, course_id)
+
+
+def mark_course_changed(db: AsyncSession, course_id: int) -> None:
+    """Invalidate cached pages of a course, now and when db commits."""
+    shared_course_cache.invalidate_course(course_id)
+    db.sync_session.info.setdefault("changed_courses", set()).add(course_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_courses(session: Session) -> None:
+    for course_id in session.info.pop("changed_courses", ()):
+        shared_course_cache.invalidate_course(course_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_courses(session: Session) -> None:
+    session.info.pop("changed_courses", None)
+
+
+def course_etag(kind: str, course: Course) -> str:
+    """Strong ETag for one representation of a course at its current version."""
+    return f'"{kind}-{course.id}-{course.version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    """304 response for a representation the client already has."""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": COURSE_CACHE_CONTROL}
+    )
+
+
+def set_cache_headers(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = COURSE_CACHE_CONTROL
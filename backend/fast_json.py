@@ -0,0 +1,33 @@
+"""
+Fast JSON responses for list endpoints.
+
+A route that returns Pydantic models has them validated again against its
+response_model, turned into plain dicts by jsonable_encoder and only then
+encoded. List routes skip that: they validate their rows once with a
+prebuilt TypeAdapter, serialize straight to JSON bytes and return a
+Response, which FastAPI passes through untouched. Their response_model
+then only documents the shape.
+"""
+from typing import Any, Dict, List, Optional, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Adapter for a list of model; build once at import time."""
+    return TypeAdapter(List[model])
+
+
+def dump_json(adapter: TypeAdapter, value: Any) -> bytes:
+    """
+    Validate value (ORM rows, dicts or models) once and serialize it.
+
+    Models of the adapter's type are passed through without revalidation.
+    """
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def json_response(adapter: TypeAdapter, value: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Response with value serialized by dump_json."""
+    return Response(content=dump_json(adapter, value), media_type="application/json", headers=headers)
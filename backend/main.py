@@ -1,28 +1,54 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
-from database import engine
-from models import Base
+import config  # noqa: F401  (loads .env)
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from database import async_engine
+from migrations import migrate, schema_is_current
 import routes_users
 import routes_courses
 import routes_videos
 import routes_progress
 import routes_ai
 import routes_timestamps
+from progress_buffer import PROGRESS_BUFFER_ENABLED, progress_buffer
+from ai_service import ai_assistant
+from youtube_utils import close_http_client as close_youtube_client
+from auth import shutdown_password_executor
+from metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from sql_profiler import SQL_PROFILER_ENABLED, SQLProfilerMiddleware
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Startup configuration. Importing this module never touches the database;
+# schema changes are applied by `python manage.py migrate`, or on startup
+# when AUTO_MIGRATE is set (convenient for a single local process, racy
+# with several workers).
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() == "true"
+READY_TIMEOUT_SECONDS = float(os.getenv("READY_TIMEOUT_SECONDS", "2"))
+
+# Set once the readiness check has seen every migration applied
+_schema_current = False
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown."""
     print("🚀 OneStop Tutor API Starting...")
+    if AUTO_MIGRATE:
+        for item in await migrate(async_engine):
+            print(f"   applied migration {item.version:04d} {item.name}")
+    if PROGRESS_BUFFER_ENABLED:
+        progress_buffer.start()
+    await ai_assistant.start()
     yield
+    await progress_buffer.stop()
+    await ai_assistant.close()
+    await close_youtube_client()
+    shutdown_password_executor()
     print("🛑 OneStop Tutor API Shutting Down...")
 
 
@@ -31,7 +57,10 @@ app = FastAPI(
     title="OneStop Tutor API",
     description="AI-Powered Learning Journey Builder",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson for every route that returns models or dicts; list routes
+    # bypass this entirely (see fast_json.py)
+    default_response_class=ORJSONResponse
 )
 
 
@@ -45,6 +74,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if SQL_PROFILER_ENABLED:
+    app.add_middleware(SQLProfilerMiddleware)
+# Added last so it wraps everything, CORS preflights included
+app.add_middleware(MetricsMiddleware)
 
 # Include routes
 app.include_router(routes_users.router)
@@ -65,15 +98,53 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this process."""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness check: the process is serving. Never touches the database."""
     return {
         "status": "healthy",
         "service": "OneStop Tutor API"
     }
 
 
+async def _check_database() -> str:
+    global _schema_current
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    if not _schema_current:
+        _schema_current = await schema_is_current(async_engine)
+    return "ok" if _schema_current else "migrations pending"
+
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness check: 503 until the database answers and its schema is current.
+
+    Point load balancer readiness probes here and liveness probes at
+    /health, so a database outage takes instances out of rotation
+    without getting them restarted.
+    """
+    try:
+        database = await asyncio.wait_for(_check_database(), READY_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        database = "timed out"
+    except (SQLAlchemyError, OSError):
+        database = "unavailable"
+
+    ready = database == "ok"
+    return ORJSONResponse(
+        {"status": "ready" if ready else "not ready", "database": database},
+        status_code=200 if ready else 503
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
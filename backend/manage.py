@@ -0,0 +1,68 @@
+"""
+Maintenance commands for the OneStop Tutor backend.
+
+Usage:
+    python manage.py migrate [--status]
+    python manage.py recompute-pomodoro-stats [--user-id ID]
+"""
+import argparse
+import asyncio
+
+
+async def migrate(args) -> None:
+    """Apply pending schema migrations, or list them with --status."""
+    from database import async_engine
+    from migrations import migrate as apply_migrations, pending_migrations
+
+    if args.status:
+        pending = await pending_migrations(async_engine)
+        for item in pending:
+            print(f"pending {item.version:04d} {item.name}")
+        print(f"{len(pending)} pending migration(s)")
+        return
+
+    ran = await apply_migrations(async_engine)
+    for item in ran:
+        print(f"applied {item.version:04d} {item.name}")
+    print(f"✅ Database is up to date ({len(ran)} migration(s) applied)")
+
+
+async def recompute_pomodoro_stats(args) -> None:
+    """Rebuild pomodoro_stats from pomodoro_sessions."""
+    from database import AsyncSessionLocal
+    from pomodoro_stats import recompute_pomodoro_stats as recompute
+
+    async with AsyncSessionLocal() as db:
+        await recompute(db, args.user_id)
+        await db.commit()
+    print(f"✅ Pomodoro stats recomputed for {'user ' + str(args.user_id) if args.user_id else 'all users'}")
+
+
+async def run(args) -> None:
+    # Imported here so --help works without database drivers
+    from database import async_engine
+
+    try:
+        await args.command(args)
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="Apply schema migrations")
+    migrate_parser.add_argument("--status", action="store_true", help="Only list pending migrations")
+    migrate_parser.set_defaults(command=migrate)
+
+    pomodoro = commands.add_parser("recompute-pomodoro-stats", help="Backfill or repair Pomodoro statistics")
+    pomodoro.add_argument("--user-id", type=int, help="Only recompute this user")
+    pomodoro.set_defaults(command=recompute_pomodoro_stats)
+
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
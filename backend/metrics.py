@@ -0,0 +1,240 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Metrics are plain counters, gauges and fixed-bucket histograms kept in
+dicts keyed by label values, so recording one costs a dict lookup and a
+bisect; there is no locking because everything runs on the event loop
+(pool waits are recorded from SQLAlchemy's greenlet, on the same thread).
+Values that already live elsewhere, such as cache hit counts and pool
+status, are copied in by collectors when /metrics is scraped.
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond heartbeats to slow upstream calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named family of samples, one per combination of label values."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, *label_values) -> None:
+        self._values[label_values] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for label_values, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) - amount
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for label_values, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """All metrics of the process plus collectors that refresh some of them on scrape."""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect: Callable[[], None]) -> None:
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            collect()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Initialize the process-wide registry
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to serve a request, by route template",
+    ["method", "route"]
+))
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "Requests served, by route template and status class",
+    ["method", "route", "status"]
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Requests being served right now"
+))
+HTTP_REQUESTS_IN_FLIGHT.set(0)
+
+DB_POOL_WAIT = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection"
+))
+DB_POOL_SIZE = registry.register(Gauge("db_pool_size", "Persistent connections the pool keeps"))
+DB_POOL_CHECKED_OUT = registry.register(Gauge("db_pool_checked_out", "Connections currently in use"))
+DB_POOL_OVERFLOW = registry.register(Gauge("db_pool_overflow", "Connections open beyond the pool size"))
+DB_POOL_SATURATION = registry.register(Gauge(
+    "db_pool_saturation", "Connections in use as a fraction of the most the pool will open"
+))
+
+UPSTREAM_REQUEST_DURATION = registry.register(Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to external services",
+    ["service", "outcome"]
+))
+
+CACHE_HITS = registry.register(Counter("cache_hits_total", "Cache lookups that found an entry", ["cache"]))
+CACHE_MISSES = registry.register(Counter("cache_misses_total", "Cache lookups that found nothing", ["cache"]))
+CACHE_HIT_RATIO = registry.register(Gauge("cache_hit_ratio", "Hits over all lookups since start", ["cache"]))
+
+
+def register_cache(name: str, cache) -> None:
+    """Export the hits and misses attributes of a cache object."""
+    def collect() -> None:
+        hits, misses = cache.hits, cache.misses
+        CACHE_HITS.set(hits, name)
+        CACHE_MISSES.set(misses, name)
+        CACHE_HIT_RATIO.set(hits / (hits + misses) if hits + misses else 0.0, name)
+    registry.add_collector(collect)
+
+
+class upstream_timer:
+    """
+    Time one call to an external service.
+
+    Set .outcome inside the block (for example to the HTTP status class);
+    it stays "error" if the block raises.
+    """
+
+    def __init__(self, service: str):
+        self.service = service
+        self.outcome = "error"
+
+    def __enter__(self) -> "upstream_timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - self._start, self.service, self.outcome)
+
+
+def status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request latency and in-flight requests.
+
+    Requests are labelled with the route template FastAPI matched (so
+    /api/videos/{video_id} rather than every id), or "unmatched". Latency
+    covers the whole response, including streamed bodies.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(elapsed, scope["method"], template)
+            HTTP_REQUESTS.inc(scope["method"], template, status_class(status_code))
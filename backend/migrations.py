@@ -0,0 +1,170 @@
+"""
+Versioned schema migrations.
+
+Each migration runs once, in version order, in its own transaction, and is
+recorded in the schema_migrations table. Migrations are written to be
+idempotent so they also bring databases created by older create_all calls
+up to date. Run them with `python manage.py migrate`, or set AUTO_MIGRATE
+to have the app apply them on startup.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, and_, delete, exists, func, inspect, or_, select, text
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import aliased
+
+from models import Base, VideoProgress
+
+# Kept out of Base.metadata so create_all never touches it
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    """Register a migration function."""
+    def register(apply: Callable[[Connection], None]):
+        MIGRATIONS.append(Migration(version, name, apply))
+        return apply
+    return register
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def _create_index(conn: Connection, name: str, table: str, *columns: str, unique: bool = False) -> None:
+    # Spelled out rather than taken from the models, which keep changing
+    conn.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    ))
+
+
+def _drop_index(conn: Connection, name: str) -> None:
+    conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+@migration(1, "initial schema")
+def _initial_schema(conn: Connection) -> None:
+    # Creates missing tables only; existing tables are fixed up below
+    Base.metadata.create_all(conn)
+
+
+@migration(2, "courses.version for ETags")
+def _course_version(conn: Connection) -> None:
+    if not _has_column(conn, "courses", "version"):
+        conn.execute(text("ALTER TABLE courses ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+@migration(3, "unique video_progress per user and video")
+def _unique_video_progress(conn: Connection) -> None:
+    # Keep the most recently updated row of any duplicates, then the highest
+    # id; legacy rows without updated_at count as oldest
+    newer = aliased(VideoProgress)
+    epoch = datetime(1970, 1, 1)
+    newer_updated = func.coalesce(newer.updated_at, epoch)
+    updated = func.coalesce(VideoProgress.updated_at, epoch)
+    conn.execute(
+        delete(VideoProgress).where(exists().where(
+            newer.user_id == VideoProgress.user_id,
+            newer.video_id == VideoProgress.video_id,
+            or_(
+                newer_updated > updated,
+                and_(newer_updated == updated, newer.id > VideoProgress.id)
+            )
+        ))
+    )
+    _create_index(conn, "ix_video_progress_user_video", "video_progress", "user_id", "video_id", unique=True)
+
+
+@migration(4, "composite indexes for hot queries")
+def _query_indexes(conn: Connection) -> None:
+    _create_index(conn, "ix_courses_user_id", "courses", "user_id")
+    _create_index(conn, "ix_videos_course_position", "videos", "course_id", "position")
+    _create_index(conn, "ix_video_progress_course_user", "video_progress", "course_id", "user_id")
+    _create_index(conn, "ix_video_progress_video", "video_progress", "video_id")
+    _create_index(conn, "ix_timestamps_video_user_time", "timestamps", "video_id", "user_id", "time_seconds")
+    _create_index(conn, "ix_pomodoro_sessions_user_completed", "pomodoro_sessions", "user_id", "completed")
+
+
+@migration(5, "keyset pagination indexes")
+def _pagination_indexes(conn: Connection) -> None:
+    # Each index ends with the listing's full sort key, id included
+    _create_index(conn, "ix_courses_user_id_id", "courses", "user_id", "id")
+    _drop_index(conn, "ix_courses_user_id")
+    _create_index(conn, "ix_videos_course_position_id", "videos", "course_id", "position", "id")
+    _drop_index(conn, "ix_videos_course_position")
+    _create_index(conn, "ix_timestamps_video_user_time_id", "timestamps", "video_id", "user_id", "time_seconds", "id")
+    _drop_index(conn, "ix_timestamps_video_user_time")
+
+
+@migration(6, "ai_response_cache trim indexes")
+def _ai_cache_trim_indexes(conn: Connection) -> None:
+    _create_index(conn, "ix_ai_response_cache_created_at", "ai_response_cache", "created_at")
+    _create_index(conn, "ix_ai_response_cache_expires_at", "ai_response_cache", "expires_at")
+
+
+def _applied_versions(conn: Connection) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def _apply(conn: Connection, item: Migration) -> None:
+    item.apply(conn)
+    conn.execute(schema_migrations.insert().values(
+        version=item.version, name=item.name, applied_at=datetime.utcnow()
+    ))
+
+
+async def migrate(engine: AsyncEngine) -> List[Migration]:
+    """Apply pending migrations and return the ones that ran."""
+    async with engine.begin() as conn:
+        applied = await conn.run_sync(_applied_versions)
+
+    ran = []
+    for item in sorted(MIGRATIONS, key=lambda m: m.version):
+        if item.version in applied:
+            continue
+        async with engine.begin() as conn:
+            await conn.run_sync(_apply, item)
+        ran.append(item)
+    return ran
+
+
+def _is_current(conn: Connection) -> bool:
+    if not inspect(conn).has_table(schema_migrations.name):
+        return False
+    applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    return all(m.version in applied for m in MIGRATIONS)
+
+
+async def schema_is_current(engine: AsyncEngine) -> bool:
+    """Whether every migration has been applied. Read-only, for readiness checks."""
+    async with engine.connect() as conn:
+        return await conn.run_sync(_is_current)
+
+
+async def pending_migrations(engine: AsyncEngine) -> List[Migration]:
+    """Migrations not yet applied to the database."""
+    async with engine.begin() as conn:
+        applied = await conn.run_sync(_applied_versions)
+    return [m for m in sorted(MIGRATIONS, key=lambda m: m.version) if m.version not in applied]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -29,11 +29,17 @@ class Course(Base):
     is_public = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     share_token = Column(String, unique=True, nullable=True, index=True)
+    version = Column(Integer, default=1, server_default="1", nullable=False)  # bumped on every change, used as ETag
 
     owner = relationship("User", back_populates="courses")
     videos = relationship("Video", back_populates="course", cascade="all, delete-orphan")
     video_progress = relationship("VideoProgress", back_populates="course")
 
+    __table_args__ = (
+        # A user's courses, in keyset pagination order
+        Index("ix_courses_user_id_id", "user_id", "id"),
+    )
+
 
 class Video(Base):
     __tablename__ = "videos"
@@ -52,6 +58,11 @@ class Video(Base):
     progress = relationship("VideoProgress", back_populates="video")
     timestamps = relationship("Timestamp", back_populates="video", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Course video lists, in keyset pagination order
+        Index("ix_videos_course_position_id", "course_id", "position", "id"),
+    )
+
 
 class VideoProgress(Base):
     __tablename__ = "video_progress"
@@ -69,6 +80,15 @@ class VideoProgress(Base):
     video = relationship("Video", back_populates="progress")
     course = relationship("Course", back_populates="video_progress")
 
+    __table_args__ = (
+        # One progress row per user and video; also the upsert conflict target
+        Index("ix_video_progress_user_video", "user_id", "video_id", unique=True),
+        # A user's progress in one course
+        Index("ix_video_progress_course_user", "course_id", "user_id"),
+        # Cleanup when a video is deleted
+        Index("ix_video_progress_video", "video_id"),
+    )
+
 
 class PomodoroSession(Base):
     __tablename__ = "pomodoro_sessions"
@@ -81,6 +101,21 @@ class PomodoroSession(Base):
 
     user = relationship("User", back_populates="pomodoro_sessions")
 
+    __table_args__ = (
+        Index("ix_pomodoro_sessions_user_completed", "user_id", "completed"),
+    )
+
+
+class PomodoroStats(Base):
+    """Running Pomodoro totals per user, kept in step with pomodoro_sessions."""
+    __tablename__ = "pomodoro_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_sessions = Column(Integer, default=0, nullable=False)
+    completed_sessions = Column(Integer, default=0, nullable=False)
+    completed_seconds = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 class Timestamp(Base):
     __tablename__ = "timestamps"
@@ -96,3 +131,44 @@ class Timestamp(Base):
 
     video = relationship("Video", back_populates="timestamps")
     user = relationship("User")
+
+    __table_args__ = (
+        # A user's timestamps on one video, in keyset pagination order
+        Index("ix_timestamps_video_user_time_id", "video_id", "user_id", "time_seconds", "id"),
+    )
+
+
+class YouTubeMetadata(Base):
+    __tablename__ = "youtube_metadata"
+
+    youtube_video_id = Column(String, primary_key=True)
+    title = Column(String, nullable=True)
+    thumbnail = Column(String, nullable=True)
+    author = Column(String, nullable=True)
+    found = Column(Boolean, default=True)  # False caches a failed lookup
+    fetched_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AIResponseCache(Base):
+    __tablename__ = "ai_response_cache"
+
+    key = Column(String, primary_key=True)  # sha256 of request type, model, video and prompt
+    request_type = Column(String)
+    video_id = Column(Integer, nullable=True, index=True)  # for invalidation on video edits
+    response = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, index=True)
+
+
+class RefreshToken(Base):
+    """One row per login session; the token hash changes on every refresh."""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    token_hash = Column(String, unique=True, index=True)  # sha256 of the current token
+    previous_hash = Column(String, nullable=True, index=True)  # to detect reuse of a rotated token
+    created_at = Column(DateTime, default=datetime.utcnow)
+    rotated_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime)
+    revoked_at = Column(DateTime, nullable=True)
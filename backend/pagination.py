@@ -0,0 +1,65 @@
+import base64
+import json
+import math
+import os
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+import config  # noqa: F401  (loads .env)
+
+# Page sizes for keyset-paginated listings
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+
+def encode_cursor(kind: str, key: Sequence[Any]) -> str:
+    """Opaque cursor pointing just after the row with this sort key."""
+    raw = json.dumps([kind, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _is_key_part(value: Any, column_type: type) -> bool:
+    # bool is an int subclass, and JSON allows NaN and Infinity
+    if isinstance(value, bool):
+        return False
+    if column_type is float:
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    return isinstance(value, column_type)
+
+
+def decode_cursor(cursor: str, kind: str, *column_types: type) -> Tuple:
+    """
+    Sort key from a cursor made by encode_cursor for the same listing.
+
+    column_types gives the Python type of each sort key column (int or
+    float), so a crafted cursor is rejected here instead of reaching the
+    database as a bind parameter of the wrong type.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    if (
+        not isinstance(values, list)
+        or len(values) != len(column_types) + 1
+        or values[0] != kind
+        or not all(_is_key_part(v, t) for v, t in zip(values[1:], column_types))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return tuple(values[1:])
+
+
+def page_size(limit: Optional[int], cursor: Optional[str]) -> Optional[int]:
+    """Rows to return, or None when the caller wants the unpaginated list."""
+    if limit is None and cursor is None:
+        return None
+    return min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+
+
+def split_page(rows: List, size: int) -> Tuple[List, bool]:
+    """Split rows fetched with limit size + 1 into the page and a has-more flag."""
+    return rows[:size], len(rows) > size
@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import case, func, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import dialect_insert
+from models import PomodoroSession, PomodoroStats
+
+
+async def record_session_started(db: AsyncSession, user_id: int) -> None:
+    """Count a new session in the user's stats; the caller commits."""
+    increment = (
+        update(PomodoroStats)
+        .where(PomodoroStats.user_id == user_id)
+        .values(total_sessions=PomodoroStats.total_sessions + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(increment)
+    if result.rowcount == 0:
+        await _create_or_increment(db, user_id, increment)
+
+
+async def record_session_completed(db: AsyncSession, user_id: int, duration: int) -> None:
+    """Count a newly completed session in the user's stats; the caller commits."""
+    increment = (
+        update(PomodoroStats)
+        .where(PomodoroStats.user_id == user_id)
+        .values(
+            completed_sessions=PomodoroStats.completed_sessions + 1,
+            completed_seconds=PomodoroStats.completed_seconds + duration,
+            updated_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(increment)
+    if result.rowcount == 0:
+        await _create_or_increment(db, user_id, increment)
+
+
+async def _create_or_increment(db: AsyncSession, user_id: int, increment) -> None:
+    """
+    Create a missing stats row from the user's sessions, or increment it.
+
+    Two first-time calls can race to create the row. The loser's totals
+    come from a snapshot that misses the winner's session, so writing them
+    over the winner's row would lose a count. The loser applies its own
+    increment to that row instead.
+    """
+    await db.flush()
+    stmt = dialect_insert(db, PomodoroStats).from_select(
+        ["user_id", "total_sessions", "completed_sessions", "completed_seconds"],
+        _session_totals(user_id),
+    ).on_conflict_do_nothing(index_elements=[PomodoroStats.user_id])
+    result = await db.execute(stmt)
+    if result.rowcount == 0:
+        await db.execute(increment)
+
+
+def _session_totals(user_id: Optional[int]):
+    return (
+        select(
+            PomodoroSession.user_id,
+            func.count(PomodoroSession.id),
+            func.coalesce(func.sum(case((PomodoroSession.completed == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((PomodoroSession.completed == True, PomodoroSession.duration), else_=0)), 0),
+        )
+        # SQLite needs a WHERE clause to parse INSERT ... SELECT ... ON CONFLICT
+        .where(true() if user_id is None else PomodoroSession.user_id == user_id)
+        .group_by(PomodoroSession.user_id)
+    )
+
+
+async def recompute_pomodoro_stats(db: AsyncSession, user_id: Optional[int] = None) -> None:
+    """
+    Rebuild stats rows from pomodoro_sessions; the caller commits.
+
+    Covers one user, or everyone when user_id is None. Used to backfill
+    existing data and when stats are read for a user without a row; a
+    single user without sessions gets an empty row.
+    """
+    await db.flush()
+    stmt = dialect_insert(db, PomodoroStats).from_select(
+        ["user_id", "total_sessions", "completed_sessions", "completed_seconds"],
+        _session_totals(user_id),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PomodoroStats.user_id],
+        set_={
+            "total_sessions": stmt.excluded.total_sessions,
+            "completed_sessions": stmt.excluded.completed_sessions,
+            "completed_seconds": stmt.excluded.completed_seconds,
+            "updated_at": datetime.utcnow(),
+        },
+    )
+    result = await db.execute(stmt)
+    
+    if user_id is not None and result.rowcount == 0:
+        # Otherwise every stats read for this user would recompute again
+        await db.execute(
+            dialect_insert(db, PomodoroStats)
+            .values(user_id=user_id, total_sessions=0, completed_sessions=0, completed_seconds=0)
+            .on_conflict_do_nothing(index_elements=[PomodoroStats.user_id])
+        )
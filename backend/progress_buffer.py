@@ -0,0 +1,261 @@
+import asyncio
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+
+import config  # noqa: F401  (loads .env)
+from database import AsyncSessionLocal
+from models import VideoProgress
+
+# Buffer configuration. The buffer is per process: with several workers,
+# progress read on one worker can lag another by up to the flush interval.
+PROGRESS_BUFFER_ENABLED = os.getenv("PROGRESS_BUFFER_ENABLED", "true").lower() == "true"
+PROGRESS_FLUSH_INTERVAL_SECONDS = float(os.getenv("PROGRESS_FLUSH_INTERVAL_SECONDS", "10"))
+PROGRESS_BUFFER_MAX_ENTRIES = int(os.getenv("PROGRESS_BUFFER_MAX_ENTRIES", "50000"))
+PROGRESS_FLUSH_BATCH_SIZE = int(os.getenv("PROGRESS_FLUSH_BATCH_SIZE", "500"))
+
+
+@dataclass
+class BufferedProgress:
+    """In-memory copy of a VideoProgress row."""
+    id: int
+    user_id: int
+    video_id: int
+    course_id: int
+    last_timestamp: int
+    completed: bool
+    updated_at: datetime
+    dirty: bool = False
+
+
+class ProgressBuffer:
+    """
+    Write-behind buffer for video progress heartbeats.
+
+    Heartbeats for a (user_id, video_id) pair that is already buffered are
+    merged in memory and answered without touching the database. Dirty rows
+    are written back in batches every flush interval, straight away when a
+    completion flag changes, and once more on shutdown.
+
+    The buffer lives in one process. With several workers, a worker that
+    doesn't hold a row reads it from the database, which can be up to one
+    flush interval behind the worker that does. Progress is eventually
+    consistent across workers; run one worker, or set
+    PROGRESS_BUFFER_ENABLED=false to write every heartbeat through, if
+    reads must see every heartbeat.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = PROGRESS_FLUSH_INTERVAL_SECONDS,
+        max_entries: int = PROGRESS_BUFFER_MAX_ENTRIES,
+        batch_size: int = PROGRESS_FLUSH_BATCH_SIZE,
+    ):
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self._entries: "OrderedDict[Tuple[int, int], BufferedProgress]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def get(self, user_id: int, video_id: int) -> Optional[BufferedProgress]:
+        """Return the buffered row for a user and video, if any."""
+        if not self.running:
+            return None
+        return self._entries.get((user_id, video_id))
+
+    def apply(
+        self,
+        user_id: int,
+        video_id: int,
+        last_timestamp: Optional[int],
+        completed: Optional[bool],
+    ) -> Optional[BufferedProgress]:
+        """
+        Merge a heartbeat into an already buffered row.
+
+        Returns None when the row is not buffered (or the buffer is not
+        running); the caller then writes through to the database and seeds
+        the buffer with the result.
+        """
+        entry = self.get(user_id, video_id)
+        if entry is None:
+            return None
+
+        if last_timestamp is not None:
+            entry.last_timestamp = last_timestamp
+        if completed is not None and completed != entry.completed:
+            entry.completed = completed
+            # Completion feeds course statistics, so don't let it wait
+            self._wakeup.set()
+
+        entry.updated_at = datetime.utcnow()
+        entry.dirty = True
+        self._entries.move_to_end((user_id, video_id))
+        return entry
+
+    def seed(self, progress: VideoProgress) -> None:
+        """Start buffering a row that was just written to the database."""
+        if not self.running:
+            return
+
+        key = (progress.user_id, progress.video_id)
+        if key not in self._entries and not self._make_room():
+            return
+
+        self._entries[key] = BufferedProgress(
+            id=progress.id,
+            user_id=progress.user_id,
+            video_id=progress.video_id,
+            course_id=progress.course_id,
+            last_timestamp=progress.last_timestamp,
+            completed=progress.completed,
+            updated_at=progress.updated_at,
+        )
+        self._entries.move_to_end(key)
+
+    def take(self, user_id: int, video_ids: List[int]) -> List[BufferedProgress]:
+        """
+        Stop buffering a user's rows for the given videos.
+
+        Returns the rows that had unflushed changes so the caller can write
+        them together with its own update.
+        """
+        taken = []
+        for video_id in video_ids:
+            entry = self._entries.pop((user_id, video_id), None)
+            if entry is not None and entry.dirty:
+                taken.append(entry)
+        return taken
+
+    def restore(self, entries: List[BufferedProgress]) -> None:
+        """
+        Put back rows returned by take() whose write failed.
+
+        Rows buffered again meanwhile hold newer data and are kept. Restored
+        rows may briefly exceed max_entries; losing writes would be worse.
+        """
+        if not self.running:
+            return
+        for entry in entries:
+            key = (entry.user_id, entry.video_id)
+            if key in self._entries:
+                continue
+            entry.dirty = True
+            self._entries[key] = entry
+
+    def discard_video(self, video_id: int) -> None:
+        """Drop buffered rows for a deleted video."""
+        for key in [k for k in self._entries if k[1] == video_id]:
+            del self._entries[key]
+
+    def discard_course(self, course_id: int) -> None:
+        """Drop buffered rows for a deleted course."""
+        for key in [k for k, e in self._entries.items() if e.course_id == course_id]:
+            del self._entries[key]
+
+    def _make_room(self) -> bool:
+        """Evict least recently used clean rows until there is a free slot."""
+        if len(self._entries) < self.max_entries:
+            return True
+
+        for key in [k for k, e in self._entries.items() if not e.dirty]:
+            del self._entries[key]
+            if len(self._entries) < self.max_entries:
+                return True
+
+        # Everything left is dirty; flush early and write through meanwhile
+        self._wakeup.set()
+        return False
+
+    def _take_dirty(self) -> List[Dict]:
+        """Collect dirty rows and mark them clean."""
+        rows = []
+        for entry in self._entries.values():
+            if entry.dirty:
+                entry.dirty = False
+                rows.append({
+                    "b_id": entry.id,
+                    "b_last_timestamp": entry.last_timestamp,
+                    "b_completed": entry.completed,
+                    "b_updated_at": entry.updated_at,
+                })
+        return rows
+
+    async def _write_rows(self, rows: List[Dict]) -> None:
+        """Write merged rows to the database as bulk UPDATEs by primary key."""
+        # Never overwrite a row that received a newer write elsewhere
+        table = VideoProgress.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.updated_at < bindparam("b_updated_at"))
+            .values(
+                last_timestamp=bindparam("b_last_timestamp"),
+                completed=bindparam("b_completed"),
+                updated_at=bindparam("b_updated_at"),
+            )
+        )
+        async with AsyncSessionLocal() as db:
+            for start in range(0, len(rows), self.batch_size):
+                await db.execute(stmt, rows[start:start + self.batch_size])
+            await db.commit()
+
+    async def flush(self) -> int:
+        """Write all dirty rows to the database and return how many were written."""
+        rows = self._take_dirty()
+        if not rows:
+            return 0
+
+        try:
+            await self._write_rows(rows)
+        except Exception as e:
+            print(f"Error flushing progress buffer: {e}")
+            # Put the rows back so the next flush retries them
+            by_id = {row["b_id"]: row for row in rows}
+            for entry in self._entries.values():
+                if entry.id in by_id:
+                    entry.dirty = True
+            return 0
+
+        return len(rows)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flush loop."""
+        if self.running:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write out everything still buffered."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await self.flush()
+        self._entries.clear()
+
+
+# Initialize progress buffer
+progress_buffer = ProgressBuffer()
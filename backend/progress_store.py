@@ -0,0 +1,133 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import dialect_insert
+from models import Video, VideoProgress
+
+
+async def upsert_video_progress(
+    db: AsyncSession,
+    user_id: int,
+    video_id: int,
+    last_timestamp: Optional[int] = None,
+    completed: Optional[bool] = None,
+) -> Optional[VideoProgress]:
+    """
+    Create or update a user's progress on a video in a single statement.
+
+    The course is taken from the video row inside the same INSERT ... SELECT,
+    so an unknown video inserts nothing and None is returned. Fields left as
+    None keep their stored value on conflict.
+    """
+    now = datetime.utcnow()
+    source = select(
+        literal(user_id),
+        Video.id,
+        Video.course_id,
+        literal(last_timestamp or 0),
+        literal(bool(completed)),
+        literal(now),
+        literal(now),
+    ).where(Video.id == video_id)
+
+    stmt = dialect_insert(db, VideoProgress).from_select(
+        ["user_id", "video_id", "course_id", "last_timestamp", "completed", "created_at", "updated_at"],
+        source,
+    )
+
+    # Only overwrite what the client actually sent
+    changes = {"updated_at": stmt.excluded.updated_at}
+    if last_timestamp is not None:
+        changes["last_timestamp"] = stmt.excluded.last_timestamp
+    if completed is not None:
+        changes["completed"] = stmt.excluded.completed
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[VideoProgress.user_id, VideoProgress.video_id],
+        set_=changes,
+    ).returning(VideoProgress)
+
+    return (await db.scalars(
+        stmt,
+        execution_options={"populate_existing": True},
+    )).one_or_none()
+
+
+async def bulk_upsert_video_progress(db: AsyncSession, user_id: int, entries: List[Dict]) -> int:
+    """
+    Apply many progress updates for one user, keeping the newest write per field.
+
+    Each entry holds video_id, updated_at and optionally last_timestamp and
+    completed. Per video only the newest non-null value of each field is
+    kept, so a completion followed by a position update keeps both. Each
+    value is written guarded by the updated_at of the entry it came from:
+    it only overwrites a stored row that is older than that entry. Entries
+    for unknown videos are skipped. Returns the number of rows sent to the
+    database.
+    """
+    # Newest (updated_at, value) per field and video; an entry without
+    # fields still creates the row
+    latest: Dict[int, Dict[str, Tuple[datetime, Any]]] = {}
+    for entry in entries:
+        fields = latest.setdefault(entry["video_id"], {})
+        for field in ("updated_at", "last_timestamp", "completed"):
+            value = entry["updated_at"] if field == "updated_at" else entry.get(field)
+            if value is not None and (field not in fields or entry["updated_at"] >= fields[field][0]):
+                fields[field] = (entry["updated_at"], value)
+    if not latest:
+        return 0
+
+    course_ids = dict(
+        (await db.execute(
+            select(Video.id, Video.course_id).where(Video.id.in_(latest.keys()))
+        )).all()
+    )
+
+    # Fields written at the same time go together, oldest write first, so a
+    # video needs at most two rounds; a row is touched once per statement
+    rounds: List[Dict[Tuple[bool, bool], List[Dict]]] = []
+    for video_id, fields in latest.items():
+        if video_id not in course_ids:
+            continue
+        writes: Dict[datetime, Dict[str, Any]] = {}
+        for field, (updated_at, value) in fields.items():
+            if field != "updated_at":
+                writes.setdefault(updated_at, {})[field] = value
+        if not writes:
+            writes[fields["updated_at"][0]] = {}
+
+        for index, updated_at in enumerate(sorted(writes)):
+            values = writes[updated_at]
+            if index == len(rounds):
+                rounds.append({})
+            key = ("last_timestamp" in values, "completed" in values)
+            rounds[index].setdefault(key, []).append({
+                "user_id": user_id,
+                "video_id": video_id,
+                "course_id": course_ids[video_id],
+                "last_timestamp": values.get("last_timestamp") or 0,
+                "completed": bool(values.get("completed")),
+                "created_at": updated_at,
+                "updated_at": updated_at,
+            })
+
+    for groups in rounds:
+        for (has_timestamp, has_completed), rows in groups.items():
+            stmt = dialect_insert(db, VideoProgress)
+            changes = {"updated_at": stmt.excluded.updated_at}
+            if has_timestamp:
+                changes["last_timestamp"] = stmt.excluded.last_timestamp
+            if has_completed:
+                changes["completed"] = stmt.excluded.completed
+
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[VideoProgress.user_id, VideoProgress.video_id],
+                set_=changes,
+                where=VideoProgress.updated_at < stmt.excluded.updated_at,
+            )
+            await db.execute(stmt, rows)
+
+    return sum(len(rows) for groups in rounds for rows in groups.values())
@@ -1,7 +1,10 @@
+import json
+
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import AsyncSessionLocal, get_async_db
 from schemas import AIAssistantRequest, AIAssistantResponse
 from auth import get_current_user
 from ai_service import ai_assistant
@@ -14,11 +17,11 @@ router = APIRouter(prefix="/api/ai", tags=["ai"])
 async def get_ai_assistance(
     request: AIAssistantRequest,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get AI assistance for video learning using Claude API."""
     # Verify video exists
-    video = db.query(Video).filter(Video.id == request.video_id).first()
+    video = await db.get(Video, request.video_id)
     if not video:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -37,17 +40,20 @@ async def get_ai_assistance(
         elif request_type == "summary":
             response = await ai_assistant.generate_summary(
                 video.title,
-                request.context or video.description
+                request.context or video.description,
+                video_id=video.id
             )
         elif request_type == "explain":
             response = await ai_assistant.explain_concept(
                 request.question,
-                level="beginner"
+                level="beginner",
+                video_id=video.id
             )
         elif request_type == "quiz":
             response = await ai_assistant.generate_quiz(
                 request.question,
-                num_questions=3
+                num_questions=3,
+                video_id=video.id
             )
         elif request_type == "notes":
             response = await ai_assistant.assist_note_taking(
@@ -72,15 +78,71 @@ async def get_ai_assistance(
         )
 
 
+@router.post("/assistant/stream")
+async def stream_ai_assistance(
+    request: AIAssistantRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream AI assistance as Server-Sent Events.
+
+    Sends one `data: {"text": ...}` event per chunk, then `event: done`, or
+    `event: error` if the upstream call fails. If the client disconnects,
+    the response is cancelled, and that closes the upstream stream.
+    """
+    # Use a short-lived session: a dependency session would stay checked
+    # out for the whole stream
+    async with AsyncSessionLocal() as db:
+        video = await db.get(Video, request.video_id)
+    if not video:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Video not found"
+        )
+    
+    request_type = request.request_type.lower()
+    try:
+        prompt, cache_as = ai_assistant.assistance_prompt(
+            request_type,
+            request.question,
+            request.context,
+            video.title,
+            video.description
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    async def events():
+        try:
+            async for text in ai_assistant.stream_claude(prompt, cache_as=cache_as, video_id=video.id):
+                yield f"data: {json.dumps({'text': text})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'type': request_type})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': f'AI service error: {str(e)}'})}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx from buffering the stream
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
 @router.post("/ask-about-video")
 async def ask_about_video(
     video_id: int,
     question: str,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Quick endpoint to ask questions about a video."""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -100,17 +162,17 @@ async def ask_about_video(
 async def summarize_video(
     video_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Generate AI summary of video content using Claude."""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Video not found"
         )
     
-    summary = await ai_assistant.generate_summary(video.title, video.description)
+    summary = await ai_assistant.generate_summary(video.title, video.description, video_id=video.id)
     
     return {
         "video_id": video_id,
@@ -1,22 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from pydantic import TypeAdapter
 import uuid
 
-from database import get_db
+from database import AsyncSessionLocal, get_async_db
 from models import Course, Video, VideoProgress, User
-from schemas import CourseCreate, CourseUpdate, CourseResponse, CourseDetailResponse, VideoResponse
+from schemas import (
+    CourseCreate, CourseUpdate, CourseResponse, CoursePage, CourseSummaryResponse, CourseDetailResponse,
+    CourseDetailWithProgressResponse
+)
 from auth import get_current_user
+from progress_buffer import progress_buffer
+from course_cache import (
+    SharedCoursePage, bump_course_version, course_etag, etag_matches, mark_course_changed, not_modified,
+    set_cache_headers, shared_course_cache
+)
+from fast_json import dump_json, json_response, list_adapter
+from pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_size, split_page
 from youtube_utils import extract_youtube_id, get_youtube_metadata, validate_youtube_url
 
 router = APIRouter(prefix="/api/courses", tags=["courses"])
 
+COURSE_LIST = list_adapter(CourseResponse)
+COURSE_PAGE = TypeAdapter(CoursePage)
+COURSE_SUMMARY_LIST = list_adapter(CourseSummaryResponse)
+COURSE_DETAIL = TypeAdapter(CourseDetailResponse)
+COURSE_DETAIL_WITH_PROGRESS = TypeAdapter(CourseDetailWithProgressResponse)
+
 
 @router.post("/", response_model=CourseResponse)
 async def create_course(
     course_data: CourseCreate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new course."""
     new_course = Course(
@@ -27,30 +45,101 @@ async def create_course(
     )
     
     db.add(new_course)
-    db.commit()
-    db.refresh(new_course)
+    await db.commit()
+    await db.refresh(new_course)
     
     return CourseResponse.from_orm(new_course)
 
 
-@router.get("/", response_model=List[CourseResponse])
+@router.get("/", response_model=Union[CoursePage, List[CourseResponse]])
 async def get_user_courses(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get courses for current user, oldest first.
+
+    Without limit or cursor every course is returned as a plain list;
+    with either, one page and the cursor of the next.
+    """
+    query = select(Course).where(Course.user_id == current_user["user_id"]).order_by(Course.id)
+    size = page_size(limit, cursor)
+    if size is None:
+        return json_response(COURSE_LIST, (await db.scalars(query)).all())
+    
+    if cursor:
+        (after_id,) = decode_cursor(cursor, "courses", int)
+        query = query.where(Course.id > after_id)
+    courses, has_more = split_page((await db.scalars(query.limit(size + 1))).all(), size)
+    return json_response(COURSE_PAGE, {
+        "items": courses,
+        "next_cursor": encode_cursor("courses", [courses[-1].id]) if has_more else None
+    })
+
+
+# Declared before /{course_id} so "summary" isn't parsed as a course id
+@router.get("/summary", response_model=List[CourseSummaryResponse])
+async def get_courses_summary(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all courses for current user."""
-    courses = db.query(Course).filter(Course.user_id == current_user["user_id"]).all()
-    return [CourseResponse.from_orm(course) for course in courses]
+    """
+    Get all courses for current user with their progress, in one query.
 
+    Progress comes from the database, so heartbeats still in the progress
+    buffer show up in last_activity_at after the next flush.
+    """
+    user_id = current_user["user_id"]
+    rows = (await db.execute(
+        select(
+            Course,
+            func.count(Video.id),
+            func.coalesce(func.sum(case((VideoProgress.completed == True, 1), else_=0)), 0),
+            func.max(VideoProgress.updated_at)
+        )
+        .outerjoin(Video, Video.course_id == Course.id)
+        .outerjoin(VideoProgress, and_(
+            VideoProgress.video_id == Video.id,
+            VideoProgress.user_id == user_id
+        ))
+        .where(Course.user_id == user_id)
+        .group_by(Course.id)
+        .order_by(Course.id)
+    )).all()
+    
+    return json_response(COURSE_SUMMARY_LIST, [
+        CourseSummaryResponse(
+            **CourseResponse.from_orm(course).model_dump(),
+            total_videos=total_videos,
+            completed_videos=completed_videos,
+            progress_percentage=round(completed_videos / total_videos * 100, 2) if total_videos > 0 else 0,
+            last_activity_at=last_activity_at
+        )
+        for course, total_videos, completed_videos, last_activity_at in rows
+    ])
 
-@router.get("/{course_id}", response_model=CourseDetailResponse)
+
+@router.get("/{course_id}", response_model=Union[CourseDetailWithProgressResponse, CourseDetailResponse])
 async def get_course_detail(
     course_id: int,
+    include: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get detailed course information with videos."""
-    course = db.query(Course).filter(Course.id == course_id).first()
+    """
+    Get detailed course information with videos.
+
+    With include=progress the caller's progress for every video is returned
+    too, loaded together with the course and videos in one query. Progress
+    changes constantly, so only the plain representation carries an ETag.
+    """
+    if include == "progress":
+        return await _course_detail_with_progress(course_id, current_user["user_id"], db)
+    
+    course = await db.get(Course, course_id)
     
     if not course:
         raise HTTPException(
@@ -65,24 +154,75 @@ async def get_course_detail(
             detail="Not authorized to view this course"
         )
     
+    etag = course_etag("course", course)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
     # Get videos ordered by position
-    videos = db.query(Video).filter(Video.course_id == course_id).order_by(Video.position).all()
+    videos = (await db.scalars(
+        select(Video).where(Video.course_id == course_id).order_by(Video.position)
+    )).all()
     
-    response = CourseDetailResponse.from_orm(course)
-    response.videos = [VideoResponse.from_orm(video) for video in videos]
+    # Course.videos is not loaded; async sessions can't lazy-load it
+    response = json_response(COURSE_DETAIL, {**CourseResponse.from_orm(course).model_dump(), "videos": videos})
+    set_cache_headers(response, etag)
     
     return response
 
 
+async def _course_detail_with_progress(
+    course_id: int,
+    user_id: int,
+    db: AsyncSession
+) -> Response:
+    """Load a course, its ordered videos and the user's progress in one query."""
+    rows = (await db.execute(
+        select(Course, Video, VideoProgress)
+        .outerjoin(Video, Video.course_id == Course.id)
+        .outerjoin(VideoProgress, and_(
+            VideoProgress.video_id == Video.id,
+            VideoProgress.user_id == user_id
+        ))
+        .where(Course.id == course_id)
+        .order_by(Video.position, Video.id)
+    )).all()
+    
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found"
+        )
+    
+    course = rows[0][0]
+    if course.user_id != user_id and not course.is_public:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this course"
+        )
+    
+    videos = [video for _, video, _ in rows if video is not None]
+    # Prefer buffered rows, which may be ahead of the database
+    progress = [
+        progress_buffer.get(record.user_id, record.video_id) or record
+        for _, _, record in rows if record is not None
+    ]
+    
+    return json_response(COURSE_DETAIL_WITH_PROGRESS, {
+        **CourseResponse.from_orm(course).model_dump(),
+        "videos": videos,
+        "progress": progress
+    })
+
+
 @router.patch("/{course_id}", response_model=CourseResponse)
 async def update_course(
     course_id: int,
     course_data: CourseUpdate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update course details."""
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.get(Course, course_id)
     
     if not course:
         raise HTTPException(
@@ -103,9 +243,10 @@ async def update_course(
         course.description = course_data.description
     if course_data.is_public is not None:
         course.is_public = course_data.is_public
+    await bump_course_version(db, course_id)
     
-    db.commit()
-    db.refresh(course)
+    await db.commit()
+    await db.refresh(course)
     
     return CourseResponse.from_orm(course)
 
@@ -114,10 +255,10 @@ async def update_course(
 async def delete_course(
     course_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a course."""
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.get(Course, course_id)
     
     if not course:
         raise HTTPException(
@@ -131,8 +272,10 @@ async def delete_course(
             detail="Not authorized to delete this course"
         )
     
-    db.delete(course)
-    db.commit()
+    await db.delete(course)
+    mark_course_changed(db, course_id)
+    await db.commit()
+    progress_buffer.discard_course(course_id)
     
     return {"message": "Course deleted successfully"}
 
@@ -141,10 +284,10 @@ async def delete_course(
 async def get_course_progress(
     course_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get course progress statistics."""
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.get(Course, course_id)
     
     if not course:
         raise HTTPException(
@@ -159,14 +302,18 @@ async def get_course_progress(
         )
     
     # Get video count
-    total_videos = db.query(Video).filter(Video.course_id == course_id).count()
+    total_videos = await db.scalar(
+        select(func.count()).select_from(Video).where(Video.course_id == course_id)
+    )
     
     # Get completed count
-    completed_videos = db.query(VideoProgress).filter(
-        VideoProgress.course_id == course_id,
-        VideoProgress.user_id == current_user["user_id"],
-        VideoProgress.completed == True
-    ).count()
+    completed_videos = await db.scalar(
+        select(func.count()).select_from(VideoProgress).where(
+            VideoProgress.course_id == course_id,
+            VideoProgress.user_id == current_user["user_id"],
+            VideoProgress.completed == True
+        )
+    )
     
     progress_percentage = (completed_videos / total_videos * 100) if total_videos > 0 else 0
     
@@ -183,10 +330,10 @@ async def get_course_progress(
 async def share_course(
     course_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Generate shareable link for course."""
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.get(Course, course_id)
     
     if not course:
         raise HTTPException(
@@ -204,7 +351,8 @@ async def share_course(
     if not course.share_token:
         course.share_token = str(uuid.uuid4())
         course.is_public = True
-        db.commit()
+        await bump_course_version(db, course_id)
+        await db.commit()
     
     return {
         "share_token": course.share_token,
@@ -212,23 +360,42 @@ async def share_course(
     }
 
 
+async def _load_shared_page(share_token: str) -> Optional[SharedCoursePage]:
+    """Load and serialize a shared course; None if the token is unknown."""
+    async with AsyncSessionLocal() as db:
+        course = await db.scalar(select(Course).where(Course.share_token == share_token))
+        if not course:
+            return None
+        
+        videos = (await db.scalars(
+            select(Video).where(Video.course_id == course.id).order_by(Video.position)
+        )).all()
+    
+    return SharedCoursePage(
+        course_id=course.id,
+        etag=course_etag("shared", course),
+        body=dump_json(COURSE_DETAIL, {**CourseResponse.from_orm(course).model_dump(), "videos": videos})
+    )
+
+
 @router.get("/share/{share_token}", response_model=CourseDetailResponse)
 async def access_shared_course(
     share_token: str,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None)
 ):
     """Access a course via share token."""
-    course = db.query(Course).filter(Course.share_token == share_token).first()
+    # Served from the shared-course cache; no database work on a hit
+    page = await shared_course_cache.get(share_token, lambda: _load_shared_page(share_token))
     
-    if not course:
+    if page is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Shared course not found"
         )
     
-    videos = db.query(Video).filter(Video.course_id == course.id).order_by(Video.position).all()
-    
-    response = CourseDetailResponse.from_orm(course)
-    response.videos = [VideoResponse.from_orm(video) for video in videos]
+    if etag_matches(if_none_match, page.etag):
+        return not_modified(page.etag)
     
+    response = Response(content=page.body, media_type="application/json")
+    set_cache_headers(response, page.etag)
     return response
@@ -1,71 +1,144 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from datetime import datetime
+from pydantic import TypeAdapter
+from datetime import datetime, timezone
 
-from database import get_db
-from models import VideoProgress, PomodoroSession, Video, Course
-from schemas import VideoProgressResponse, VideoProgressUpdate, PomodoroSessionResponse, PomodoroSessionCreate
+from database import get_async_db
+from models import VideoProgress, PomodoroSession, PomodoroStats, Course
+from schemas import (
+    VideoProgressResponse, VideoProgressUpdate, VideoProgressBatchEntry, CourseVideoProgressResponse,
+    PomodoroSessionResponse, PomodoroSessionCreate
+)
 from auth import get_current_user
+from progress_buffer import progress_buffer
+from progress_store import upsert_video_progress, bulk_upsert_video_progress
+from pomodoro_stats import record_session_started, record_session_completed, recompute_pomodoro_stats
+from fast_json import json_response, list_adapter
 
 router = APIRouter(prefix="/api/progress", tags=["progress"])
 
+VIDEO_PROGRESS_LIST = list_adapter(VideoProgressResponse)
+COURSE_VIDEO_PROGRESS = TypeAdapter(CourseVideoProgressResponse)
+
+# Largest number of updates accepted by the batch endpoint
+MAX_PROGRESS_BATCH_SIZE = 500
+
 
 @router.post("/video/{video_id}", response_model=VideoProgressResponse)
 async def update_video_progress(
     video_id: int,
     progress_data: VideoProgressUpdate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update or create video progress."""
-    # Get video and course
-    video = db.query(Video).filter(Video.id == video_id).first()
-    if not video:
+    # Merge into the write-behind buffer when this row is already tracked
+    buffered = progress_buffer.apply(
+        current_user["user_id"],
+        video_id,
+        progress_data.last_timestamp,
+        progress_data.completed
+    )
+    if buffered is not None:
+        return VideoProgressResponse.from_orm(buffered)
+    
+    # Insert or update the row in one statement
+    progress = await upsert_video_progress(
+        db,
+        current_user["user_id"],
+        video_id,
+        progress_data.last_timestamp,
+        progress_data.completed
+    )
+    if not progress:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Video not found"
         )
     
-    # Get existing progress or create new
-    progress = db.query(VideoProgress).filter(
-        VideoProgress.user_id == current_user["user_id"],
-        VideoProgress.video_id == video_id
-    ).first()
+    await db.commit()
     
-    if not progress:
-        progress = VideoProgress(
-            user_id=current_user["user_id"],
-            video_id=video_id,
-            course_id=video.course_id
+    progress_buffer.seed(progress)
+    
+    return VideoProgressResponse.from_orm(progress)
+
+
+@router.post("/batch", response_model=List[VideoProgressResponse])
+async def batch_update_video_progress(
+    updates: List[VideoProgressBatchEntry],
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Apply progress updates for many videos at once; the newest write wins."""
+    if len(updates) > MAX_PROGRESS_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_PROGRESS_BATCH_SIZE} updates per batch"
         )
-        db.add(progress)
     
-    # Update fields
-    if progress_data.last_timestamp is not None:
-        progress.last_timestamp = progress_data.last_timestamp
-    if progress_data.completed is not None:
-        progress.completed = progress_data.completed
+    user_id = current_user["user_id"]
+    now = datetime.utcnow()
+    entries = []
+    for progress_update in updates:
+        # Store naive UTC and never trust a client clock that runs ahead
+        updated_at = progress_update.client_updated_at
+        if updated_at.tzinfo is not None:
+            updated_at = updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+        entries.append({
+            "video_id": progress_update.video_id,
+            "last_timestamp": progress_update.last_timestamp,
+            "completed": progress_update.completed,
+            "updated_at": min(updated_at, now),
+        })
     
-    progress.updated_at = datetime.utcnow()
+    # Unflushed heartbeats compete with the batch on the same terms
+    video_ids = list({entry["video_id"] for entry in entries})
+    taken = progress_buffer.take(user_id, video_ids)
+    for buffered in taken:
+        entries.append({
+            "video_id": buffered.video_id,
+            "last_timestamp": buffered.last_timestamp,
+            "completed": buffered.completed,
+            "updated_at": buffered.updated_at,
+        })
     
-    db.commit()
-    db.refresh(progress)
+    try:
+        await bulk_upsert_video_progress(db, user_id, entries)
+        await db.commit()
+    except Exception:
+        # Nothing was written; hand the heartbeats back for the next flush
+        progress_buffer.restore(taken)
+        raise
     
-    return VideoProgressResponse.from_orm(progress)
+    progress_records = (await db.scalars(
+        select(VideoProgress).where(
+            VideoProgress.user_id == user_id,
+            VideoProgress.video_id.in_(video_ids)
+        )
+    )).all()
+    
+    return json_response(VIDEO_PROGRESS_LIST, progress_records)
 
 
 @router.get("/video/{video_id}", response_model=VideoProgressResponse)
 async def get_video_progress(
     video_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get progress for a specific video."""
-    progress = db.query(VideoProgress).filter(
-        VideoProgress.user_id == current_user["user_id"],
-        VideoProgress.video_id == video_id
-    ).first()
+    buffered = progress_buffer.get(current_user["user_id"], video_id)
+    if buffered is not None:
+        return VideoProgressResponse.from_orm(buffered)
+    
+    progress = await db.scalar(
+        select(VideoProgress).where(
+            VideoProgress.user_id == current_user["user_id"],
+            VideoProgress.video_id == video_id
+        )
+    )
     
     if not progress:
         raise HTTPException(
@@ -76,15 +149,15 @@ async def get_video_progress(
     return VideoProgressResponse.from_orm(progress)
 
 
-@router.get("/course/{course_id}")
+@router.get("/course/{course_id}", response_model=CourseVideoProgressResponse)
 async def get_course_progress(
     course_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get progress for all videos in a course."""
     # Verify course ownership or access
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.get(Course, course_id)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -98,22 +171,27 @@ async def get_course_progress(
         )
     
     # Get all progress records
-    progress_records = db.query(VideoProgress).filter(
-        VideoProgress.course_id == course_id,
-        VideoProgress.user_id == current_user["user_id"]
-    ).all()
+    progress_records = (await db.scalars(
+        select(VideoProgress).where(
+            VideoProgress.course_id == course_id,
+            VideoProgress.user_id == current_user["user_id"]
+        )
+    )).all()
     
-    return {
-        "course_id": course_id,
-        "progress": [VideoProgressResponse.from_orm(p) for p in progress_records]
-    }
+    # Prefer buffered rows, which may be ahead of the database
+    progress_records = [
+        progress_buffer.get(p.user_id, p.video_id) or p
+        for p in progress_records
+    ]
+    
+    return json_response(COURSE_VIDEO_PROGRESS, {"course_id": course_id, "progress": progress_records})
 
 
 @router.post("/pomodoro/start", response_model=PomodoroSessionResponse)
 async def start_pomodoro_session(
     session_data: PomodoroSessionCreate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Start a new Pomodoro session."""
     session = PomodoroSession(
@@ -123,8 +201,10 @@ async def start_pomodoro_session(
     )
     
     db.add(session)
-    db.commit()
-    db.refresh(session)
+    await db.flush()
+    await record_session_started(db, current_user["user_id"])
+    await db.commit()
+    await db.refresh(session)
     
     return PomodoroSessionResponse.from_orm(session)
 
@@ -133,13 +213,31 @@ async def start_pomodoro_session(
 async def complete_pomodoro_session(
     session_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark Pomodoro session as completed."""
-    session = db.query(PomodoroSession).filter(
-        PomodoroSession.id == session_id,
-        PomodoroSession.user_id == current_user["user_id"]
-    ).first()
+    # Flip the flag only once so repeated calls don't count twice in the stats
+    duration = await db.scalar(
+        update(PomodoroSession)
+        .where(
+            PomodoroSession.id == session_id,
+            PomodoroSession.user_id == current_user["user_id"],
+            PomodoroSession.completed == False
+        )
+        .values(completed=True)
+        .returning(PomodoroSession.duration)
+        .execution_options(synchronize_session=False)
+    )
+    if duration is not None:
+        await record_session_completed(db, current_user["user_id"], duration)
+        await db.commit()
+    
+    session = await db.scalar(
+        select(PomodoroSession).where(
+            PomodoroSession.id == session_id,
+            PomodoroSession.user_id == current_user["user_id"]
+        )
+    )
     
     if not session:
         raise HTTPException(
@@ -147,32 +245,25 @@ async def complete_pomodoro_session(
             detail="Session not found"
         )
     
-    session.completed = True
-    db.commit()
-    db.refresh(session)
-    
     return PomodoroSessionResponse.from_orm(session)
 
 
 @router.get("/pomodoro/stats")
 async def get_pomodoro_stats(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get Pomodoro session statistics for user."""
-    total_sessions = db.query(PomodoroSession).filter(
-        PomodoroSession.user_id == current_user["user_id"]
-    ).count()
-    
-    completed_sessions = db.query(PomodoroSession).filter(
-        PomodoroSession.user_id == current_user["user_id"],
-        PomodoroSession.completed == True
-    ).count()
-    
-    total_duration = db.query(PomodoroSession).filter(
-        PomodoroSession.user_id == current_user["user_id"],
-        PomodoroSession.completed == True
-    ).with_entities(db.func.sum(PomodoroSession.duration)).scalar() or 0
+    stats = await db.get(PomodoroStats, current_user["user_id"])
+    if stats is None:
+        # Sessions from before stats were tracked; build the row once
+        await recompute_pomodoro_stats(db, current_user["user_id"])
+        await db.commit()
+        stats = await db.get(PomodoroStats, current_user["user_id"])
+    
+    total_sessions = stats.total_sessions if stats else 0
+    completed_sessions = stats.completed_sessions if stats else 0
+    total_duration = stats.completed_seconds if stats else 0
     
     return {
         "total_sessions": total_sessions,
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+from typing import List, Optional, Union
 
-from database import get_db
+from database import get_async_db
 from auth import get_current_user
 from models import Timestamp, Video
-from pydantic import BaseModel
+from fast_json import json_response, list_adapter
+from pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_size, split_page
+from pydantic import BaseModel, TypeAdapter
 
 router = APIRouter(prefix="/api/timestamps", tags=["timestamps"])
 
@@ -14,13 +18,13 @@ class TimestampCreate(BaseModel):
     video_id: int
     time_seconds: float
     label: str
-    note: str = None
+    note: Optional[str] = None
 
 
 class TimestampUpdate(BaseModel):
-    time_seconds: float = None
-    label: str = None
-    note: str = None
+    time_seconds: Optional[float] = None
+    label: Optional[str] = None
+    note: Optional[str] = None
 
 
 class TimestampResponse(BaseModel):
@@ -28,7 +32,7 @@ class TimestampResponse(BaseModel):
     video_id: int
     time_seconds: float
     label: str
-    note: str = None
+    note: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -36,15 +40,24 @@ class TimestampResponse(BaseModel):
         from_attributes = True
 
 
+class TimestampPage(BaseModel):
+    items: List[TimestampResponse]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+
+
+TIMESTAMP_LIST = list_adapter(TimestampResponse)
+TIMESTAMP_PAGE = TypeAdapter(TimestampPage)
+
+
 @router.post("/", response_model=TimestampResponse)
 async def create_timestamp(
     timestamp_data: TimestampCreate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new timestamp for a video."""
     # Verify video exists
-    video = db.query(Video).filter(Video.id == timestamp_data.video_id).first()
+    video = await db.get(Video, timestamp_data.video_id)
     if not video:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -54,40 +67,58 @@ async def create_timestamp(
     # Create timestamp
     timestamp = Timestamp(
         video_id=timestamp_data.video_id,
-        user_id=current_user["id"],
+        user_id=current_user["user_id"],
         time_seconds=timestamp_data.time_seconds,
         label=timestamp_data.label,
         note=timestamp_data.note
     )
 
     db.add(timestamp)
-    db.commit()
-    db.refresh(timestamp)
+    await db.commit()
+    await db.refresh(timestamp)
 
     return timestamp
 
 
-@router.get("/video/{video_id}")
+@router.get("/video/{video_id}", response_model=Union[TimestampPage, List[TimestampResponse]])
 async def get_video_timestamps(
     video_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all timestamps for a specific video."""
+    """
+    Get timestamps for a specific video, in time order.
+
+    Without limit or cursor every timestamp is returned as a plain list;
+    with either, one page and the cursor of the next.
+    """
     # Verify video exists
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Video not found"
         )
 
-    timestamps = db.query(Timestamp).filter(
+    query = select(Timestamp).where(
         Timestamp.video_id == video_id,
-        Timestamp.user_id == current_user["id"]
-    ).order_by(Timestamp.time_seconds).all()
-
-    return timestamps
+        Timestamp.user_id == current_user["user_id"]
+    ).order_by(Timestamp.time_seconds, Timestamp.id)
+    size = page_size(limit, cursor)
+    if size is None:
+        return json_response(TIMESTAMP_LIST, (await db.scalars(query)).all())
+
+    if cursor:
+        after = decode_cursor(cursor, "timestamps", float, int)
+        query = query.where(tuple_(Timestamp.time_seconds, Timestamp.id) > after)
+    timestamps, has_more = split_page((await db.scalars(query.limit(size + 1))).all(), size)
+    last = timestamps[-1] if has_more else None
+    return json_response(TIMESTAMP_PAGE, {
+        "items": timestamps,
+        "next_cursor": encode_cursor("timestamps", [last.time_seconds, last.id]) if last else None
+    })
 
 
 @router.put("/{timestamp_id}", response_model=TimestampResponse)
@@ -95,13 +126,15 @@ async def update_timestamp(
     timestamp_id: int,
     timestamp_data: TimestampUpdate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a timestamp."""
-    timestamp = db.query(Timestamp).filter(
-        Timestamp.id == timestamp_id,
-        Timestamp.user_id == current_user["id"]
-    ).first()
+    timestamp = await db.scalar(
+        select(Timestamp).where(
+            Timestamp.id == timestamp_id,
+            Timestamp.user_id == current_user["user_id"]
+        )
+    )
 
     if not timestamp:
         raise HTTPException(
@@ -118,8 +151,7 @@ async def update_timestamp(
         timestamp.note = timestamp_data.note
 
     timestamp.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(timestamp)
+    await db.commit()
 
     return timestamp
 
@@ -128,13 +160,15 @@ async def update_timestamp(
 async def delete_timestamp(
     timestamp_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a timestamp."""
-    timestamp = db.query(Timestamp).filter(
-        Timestamp.id == timestamp_id,
-        Timestamp.user_id == current_user["id"]
-    ).first()
+    timestamp = await db.scalar(
+        select(Timestamp).where(
+            Timestamp.id == timestamp_id,
+            Timestamp.user_id == current_user["user_id"]
+        )
+    )
 
     if not timestamp:
         raise HTTPException(
@@ -142,7 +176,7 @@ async def delete_timestamp(
             detail="Timestamp not found"
         )
 
-    db.delete(timestamp)
-    db.commit()
+    await db.delete(timestamp)
+    await db.commit()
 
     return {"message": "Timestamp deleted successfully"}
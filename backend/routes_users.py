@@ -1,20 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import timedelta
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
 
-from database import get_db
-from models import User
-from schemas import UserCreate, UserLogin, UserResponse, Token
-from auth import hash_password, verify_password, create_access_token, get_current_user
+from database import get_async_db
+from models import RefreshToken, User
+from schemas import UserCreate, UserLogin, UserResponse, Token, TokenRefresh
+from auth import (
+    hash_password, verify_password, password_needs_rehash, create_access_token, get_current_user,
+    generate_refresh_token, hash_refresh_token, REFRESH_TOKEN_EXPIRE_DAYS, REFRESH_TOKEN_REUSE_GRACE_SECONDS
+)
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
 
+async def _issue_refresh_token(db: AsyncSession, user_id: int) -> str:
+    """Start a refresh-token session for a user; the caller commits."""
+    now = datetime.utcnow()
+    
+    # Sessions that ran out are no longer useful for reuse detection either
+    await db.execute(
+        delete(RefreshToken).where(RefreshToken.user_id == user_id, RefreshToken.expires_at <= now)
+    )
+    
+    token, token_hash = generate_refresh_token()
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=token_hash,
+        created_at=now,
+        rotated_at=now,
+        expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return token
+
+
 @router.post("/register", response_model=Token)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user."""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -22,15 +46,17 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     new_user = User(
         email=user_data.email,
         password_hash=hashed_password
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.flush()
+    refresh_token = await _issue_refresh_token(db, new_user.id)
+    await db.commit()
+    await db.refresh(new_user)
     
     # Create access token
     access_token = create_access_token(
@@ -40,22 +66,30 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     
     return {
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": UserResponse.from_orm(new_user)
     }
 
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login user."""
     # Find user by email
-    user = db.query(User).filter(User.email == user_data.email).first()
-    if not user or not verify_password(user_data.password, user.password_hash):
+    user = await db.scalar(select(User).where(User.email == user_data.email))
+    if not user or not await verify_password(user_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
+    # Move the stored hash to the configured bcrypt cost
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = await hash_password(user_data.password)
+    
+    refresh_token = await _issue_refresh_token(db, user.id)
+    await db.commit()
+    
     # Create access token
     access_token = create_access_token(
         data={"sub": str(user.id)},
@@ -64,18 +98,93 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     
     return {
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": UserResponse.from_orm(user)
     }
 
 
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(token_data: TokenRefresh, db: AsyncSession = Depends(get_async_db)):
+    """Exchange a refresh token for a new access token and a rotated refresh token."""
+    token_hash = hash_refresh_token(token_data.refresh_token)
+    now = datetime.utcnow()
+    new_token, new_hash = generate_refresh_token()
+    
+    # Look up and rotate in one statement, so a token can only be used once
+    user_id = await db.scalar(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now
+        )
+        .values(
+            token_hash=new_hash,
+            previous_hash=token_hash,
+            rotated_at=now,
+            expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+        .returning(RefreshToken.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    
+    if user_id is None:
+        # A rotated token used again after the grace window means it leaked:
+        # end that session
+        await db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.previous_hash == token_hash,
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.rotated_at < now - timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+            )
+            .values(revoked_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+    
+    user = await db.get(User, user_id)
+    await db.commit()
+    
+    access_token = create_access_token(
+        data={"sub": str(user_id)},
+        expires_delta=timedelta(minutes=30)
+    )
+    
+    return {
+        "access_token": access_token,
+        "refresh_token": new_token,
+        "token_type": "bearer",
+        "user": UserResponse.from_orm(user)
+    }
+
+
+@router.post("/logout")
+async def logout(token_data: TokenRefresh, db: AsyncSession = Depends(get_async_db)):
+    """Revoke a refresh token."""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == hash_refresh_token(token_data.refresh_token))
+        .values(revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    
+    return {"message": "Logged out successfully"}
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user information."""
-    user = db.query(User).filter(User.id == current_user["user_id"]).first()
+    user = await db.get(User, current_user["user_id"])
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
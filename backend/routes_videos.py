@@ -1,26 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from sqlalchemy import case, delete, func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from pydantic import TypeAdapter
 
-from database import get_db
+from database import get_async_db
 from models import Course, Video, VideoProgress, User
-from schemas import VideoCreate, VideoUpdate, VideoResponse
+from schemas import (
+    VideoCreate, VideoUpdate, VideoResponse, VideoImportRequest, VideoImportResponse,
+    VideoReorder, VideoOrderUpdate, VideoPage
+)
 from auth import get_current_user
-from youtube_utils import extract_youtube_id, get_youtube_metadata, validate_youtube_url
+from ai_cache import ai_response_cache
+from progress_buffer import progress_buffer
+from course_cache import bump_course_version, course_etag, etag_matches, not_modified, set_cache_headers
+from fast_json import json_response, list_adapter
+from pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_size, split_page
+from youtube_utils import extract_youtube_id, get_youtube_metadata, get_youtube_metadata_many, validate_youtube_url
 
 router = APIRouter(prefix="/api/videos", tags=["videos"])
 
+VIDEO_LIST = list_adapter(VideoResponse)
+VIDEO_PAGE = TypeAdapter(VideoPage)
+
+# Largest number of videos accepted by one import
+MAX_IMPORT_VIDEOS = 500
+
+# Spacing between neighbouring video positions. A move takes the midpoint of
+# its new neighbours, so only the moved row changes until a gap runs out and
+# the course is renumbered.
+POSITION_GAP = 1024
+
+
+async def _apply_order(db: AsyncSession, course_id: int, video_ids: List[int]) -> None:
+    """Renumber a course's videos to evenly spaced positions in one UPDATE."""
+    await db.execute(
+        update(Video)
+        .where(Video.course_id == course_id, Video.id.in_(video_ids))
+        .values(position=case(
+            {video_id: index * POSITION_GAP for index, video_id in enumerate(video_ids)},
+            value=Video.id
+        ))
+        .execution_options(synchronize_session=False)
+    )
+
 
 @router.post("/{course_id}/add", response_model=VideoResponse)
 async def add_video_to_course(
     course_id: int,
     video_data: VideoCreate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add a YouTube video to a course."""
     # Check course ownership
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.get(Course, course_id)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -43,12 +77,15 @@ async def add_video_to_course(
     # Extract video ID
     youtube_id = extract_youtube_id(video_data.youtube_url)
     
-    # Get metadata
-    metadata = get_youtube_metadata(youtube_id)
+    # Get metadata, with the connection back in the pool while YouTube answers
+    await db.commit()
+    metadata = await get_youtube_metadata(youtube_id, db)
     
     # Get next position
-    last_video = db.query(Video).filter(Video.course_id == course_id).order_by(Video.position.desc()).first()
-    next_position = (last_video.position + 1) if last_video else 0
+    last_video = await db.scalar(
+        select(Video).where(Video.course_id == course_id).order_by(Video.position.desc()).limit(1)
+    )
+    next_position = (last_video.position + POSITION_GAP) if last_video else 0
     
     # Create video
     new_video = Video(
@@ -61,8 +98,9 @@ async def add_video_to_course(
     )
     
     db.add(new_video)
-    db.commit()
-    db.refresh(new_video)
+    await bump_course_version(db, course_id)
+    await db.commit()
+    await db.refresh(new_video)
     
     # Initialize progress tracking for current user
     progress = VideoProgress(
@@ -73,19 +111,127 @@ async def add_video_to_course(
         completed=False
     )
     db.add(progress)
-    db.commit()
+    await db.commit()
     
     return VideoResponse.from_orm(new_video)
 
 
-@router.get("/course/{course_id}/list", response_model=List[VideoResponse])
+@router.post("/{course_id}/import", response_model=VideoImportResponse)
+async def import_videos_to_course(
+    course_id: int,
+    import_data: VideoImportRequest,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Add many YouTube videos to a course in one request, in the given order."""
+    course = await db.get(Course, course_id)
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found"
+        )
+    
+    if course.user_id != current_user["user_id"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to add videos to this course"
+        )
+    
+    entries = list(import_data.urls)
+    if import_data.playlist:
+        entries += import_data.playlist.replace(",", " ").split()
+    
+    # Validate and deduplicate, keeping the first occurrence of each video
+    existing_ids = set((await db.scalars(
+        select(Video.youtube_video_id).where(Video.course_id == course_id)
+    )).all())
+    invalid, duplicates = [], []
+    to_add = {}
+    for entry in entries:
+        entry = entry.strip()
+        if not entry:
+            continue
+        youtube_id = extract_youtube_id(entry)
+        if youtube_id is None:
+            invalid.append(entry)
+        elif youtube_id in existing_ids or youtube_id in to_add:
+            duplicates.append(entry)
+        else:
+            to_add[youtube_id] = entry
+    
+    if len(to_add) > MAX_IMPORT_VIDEOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_IMPORT_VIDEOS} videos per import"
+        )
+    if not to_add:
+        return VideoImportResponse(videos=[], invalid=invalid, duplicates=duplicates)
+    
+    # Fetching can take minutes; don't sit idle in a transaction meanwhile.
+    # The cache rows and videos are then written in one short transaction.
+    await db.commit()
+    metadata = await get_youtube_metadata_many(list(to_add), db)
+    
+    last_position = await db.scalar(
+        select(func.max(Video.position)).where(Video.course_id == course_id)
+    )
+    next_position = 0 if last_position is None else last_position + POSITION_GAP
+    
+    new_videos = (await db.scalars(
+        insert(Video).returning(Video),
+        [
+            {
+                "course_id": course_id,
+                "youtube_url": url,
+                "youtube_video_id": youtube_id,
+                "title": metadata[youtube_id].get("title", "Untitled Video"),
+                "position": next_position + offset * POSITION_GAP,
+            }
+            for offset, (youtube_id, url) in enumerate(to_add.items())
+        ]
+    )).all()
+    
+    # Initialize progress tracking for current user
+    await db.execute(
+        insert(VideoProgress),
+        [
+            {
+                "user_id": current_user["user_id"],
+                "video_id": video.id,
+                "course_id": course_id,
+                "last_timestamp": 0,
+                "completed": False,
+            }
+            for video in new_videos
+        ]
+    )
+    await bump_course_version(db, course_id)
+    await db.commit()
+    
+    new_videos = sorted(new_videos, key=lambda video: video.position)
+    return VideoImportResponse(
+        videos=[VideoResponse.from_orm(video) for video in new_videos],
+        invalid=invalid,
+        duplicates=duplicates
+    )
+
+
+@router.get("/course/{course_id}/list", response_model=Union[VideoPage, List[VideoResponse]])
 async def get_course_videos(
     course_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all videos in a course."""
-    course = db.query(Course).filter(Course.id == course_id).first()
+    """
+    Get videos in a course, in course order.
+
+    Without limit or cursor every video is returned as a plain list;
+    with either, one page and the cursor of the next.
+    """
+    course = await db.get(Course, course_id)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -99,8 +245,26 @@ async def get_course_videos(
             detail="Not authorized"
         )
     
-    videos = db.query(Video).filter(Video.course_id == course_id).order_by(Video.position).all()
-    return [VideoResponse.from_orm(video) for video in videos]
+    query = select(Video).where(Video.course_id == course_id).order_by(Video.position, Video.id)
+    size = page_size(limit, cursor)
+    # Pages of the same version differ by cursor, so only the full list gets an ETag
+    if size is None:
+        etag = course_etag("videos", course)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response = json_response(VIDEO_LIST, (await db.scalars(query)).all())
+        set_cache_headers(response, etag)
+        return response
+    
+    if cursor:
+        after = decode_cursor(cursor, "videos", int, int)
+        query = query.where(tuple_(Video.position, Video.id) > after)
+    videos, has_more = split_page((await db.scalars(query.limit(size + 1))).all(), size)
+    last = videos[-1] if has_more else None
+    return json_response(VIDEO_PAGE, {
+        "items": videos,
+        "next_cursor": encode_cursor("videos", [last.position, last.id]) if last else None
+    })
 
 
 @router.patch("/{video_id}", response_model=VideoResponse)
@@ -108,10 +272,10 @@ async def update_video(
     video_id: int,
     video_data: VideoUpdate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update video details."""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -119,7 +283,7 @@ async def update_video(
         )
     
     # Check authorization
-    course = db.query(Course).filter(Course.id == video.course_id).first()
+    course = await db.get(Course, video.course_id)
     if course.user_id != current_user["user_id"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -127,13 +291,22 @@ async def update_video(
         )
     
     # Update fields
-    if video_data.title is not None:
+    content_changed = False
+    if video_data.title is not None and video_data.title != video.title:
         video.title = video_data.title
-    if video_data.description is not None:
+        content_changed = True
+    if video_data.description is not None and video_data.description != video.description:
         video.description = video_data.description
+        content_changed = True
+    if content_changed:
+        await bump_course_version(db, video.course_id)
     
-    db.commit()
-    db.refresh(video)
+    await db.commit()
+    await db.refresh(video)
+    
+    # AI responses were generated from the old title and description
+    if content_changed:
+        await ai_response_cache.invalidate_video(video_id)
     
     return VideoResponse.from_orm(video)
 
@@ -141,12 +314,12 @@ async def update_video(
 @router.post("/{video_id}/reorder")
 async def reorder_video(
     video_id: int,
-    new_position: int,
+    reorder_data: VideoReorder,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Reorder video position in course."""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    """Move a video to a new index in its course, rewriting only that row."""
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -154,44 +327,110 @@ async def reorder_video(
         )
     
     # Check authorization
-    course = db.query(Course).filter(Course.id == video.course_id).first()
+    course = await db.get(Course, video.course_id)
     if course.user_id != current_user["user_id"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized"
         )
     
-    old_position = video.position
+    # Find the positions of the videos the moved one will sit between
+    siblings = (
+        select(Video.position)
+        .where(Video.course_id == video.course_id, Video.id != video_id)
+        .order_by(Video.position, Video.id)
+    )
+    new_position = max(reorder_data.new_position, 0)
+    if new_position == 0:
+        before, after = None, await db.scalar(siblings.limit(1))
+    else:
+        neighbours = (await db.scalars(siblings.offset(new_position - 1).limit(2))).all()
+        if neighbours:
+            before, after = neighbours[0], neighbours[1] if len(neighbours) > 1 else None
+        else:
+            # Past the end: append after the last video
+            before = await db.scalar(
+                select(func.max(Video.position))
+                .where(Video.course_id == video.course_id, Video.id != video_id)
+            )
+            after = None
     
-    # Get all videos in course
-    videos = db.query(Video).filter(Video.course_id == video.course_id).order_by(Video.position).all()
+    if before is None and after is None:
+        position = 0
+    elif before is None:
+        position = after - POSITION_GAP
+    elif after is None:
+        position = before + POSITION_GAP
+    elif after - before > 1:
+        position = (before + after) // 2
+    else:
+        position = None
     
-    # Reorder
-    if new_position < old_position:
-        # Moving up
-        for v in videos:
-            if new_position <= v.position < old_position and v.id != video_id:
-                v.position += 1
+    if position is not None:
+        video.position = position
     else:
-        # Moving down
-        for v in videos:
-            if old_position < v.position <= new_position and v.id != video_id:
-                v.position -= 1
+        # No room between the neighbours: renumber the whole course once
+        video_ids = list((await db.scalars(
+            select(Video.id)
+            .where(Video.course_id == video.course_id, Video.id != video_id)
+            .order_by(Video.position, Video.id)
+        )).all())
+        video_ids.insert(new_position, video_id)
+        await _apply_order(db, video.course_id, video_ids)
+        position = video_ids.index(video_id) * POSITION_GAP
+    await bump_course_version(db, video.course_id)
+    
+    await db.commit()
+    
+    return {"message": "Video reordered successfully", "position": position}
+
+
+@router.put("/course/{course_id}/order")
+async def set_course_order(
+    course_id: int,
+    order_data: VideoOrderUpdate,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Replace the order of every video in a course."""
+    course = await db.get(Course, course_id)
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found"
+        )
+    
+    if course.user_id != current_user["user_id"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+    
+    current_ids = set((await db.scalars(
+        select(Video.id).where(Video.course_id == course_id)
+    )).all())
+    if len(order_data.video_ids) != len(current_ids) or set(order_data.video_ids) != current_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="video_ids must list every video in the course exactly once"
+        )
     
-    video.position = new_position
-    db.commit()
+    if order_data.video_ids:
+        await _apply_order(db, course_id, order_data.video_ids)
+        await bump_course_version(db, course_id)
+        await db.commit()
     
-    return {"message": "Video reordered successfully"}
+    return {"message": "Course order updated successfully"}
 
 
 @router.delete("/{video_id}")
 async def delete_video(
     video_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a video from course."""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -199,7 +438,7 @@ async def delete_video(
         )
     
     # Check authorization
-    course = db.query(Course).filter(Course.id == video.course_id).first()
+    course = await db.get(Course, video.course_id)
     if course.user_id != current_user["user_id"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -207,10 +446,13 @@ async def delete_video(
         )
     
     # Delete related progress records
-    db.query(VideoProgress).filter(VideoProgress.video_id == video_id).delete()
+    await db.execute(delete(VideoProgress).where(VideoProgress.video_id == video_id))
+    progress_buffer.discard_video(video_id)
     
     # Delete video
-    db.delete(video)
-    db.commit()
+    await db.delete(video)
+    await bump_course_version(db, video.course_id)
+    await db.commit()
+    await ai_response_cache.invalidate_video(video_id)
     
     return {"message": "Video deleted successfully"}
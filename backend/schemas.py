@@ -52,6 +52,30 @@ class VideoResponse(VideoBase):
         from_attributes = True
 
 
+class VideoReorder(BaseModel):
+    new_position: int  # zero-based index in the course's current order
+
+
+class VideoOrderUpdate(BaseModel):
+    video_ids: List[int]  # every video in the course, in the new order
+
+
+class VideoPage(BaseModel):
+    items: List[VideoResponse]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+
+
+class VideoImportRequest(BaseModel):
+    urls: List[str] = []
+    playlist: Optional[str] = None  # exported list: URLs or IDs separated by whitespace or commas
+
+
+class VideoImportResponse(BaseModel):
+    videos: List[VideoResponse]
+    invalid: List[str] = []
+    duplicates: List[str] = []
+
+
 # Video Progress Schemas
 class VideoProgressBase(BaseModel):
     last_timestamp: int = 0
@@ -63,6 +87,11 @@ class VideoProgressUpdate(BaseModel):
     completed: Optional[bool] = None
 
 
+class VideoProgressBatchEntry(VideoProgressUpdate):
+    video_id: int
+    client_updated_at: datetime
+
+
 class VideoProgressResponse(VideoProgressBase):
     id: int
     user_id: int
@@ -101,10 +130,31 @@ class CourseResponse(CourseBase):
         from_attributes = True
 
 
+class CourseSummaryResponse(CourseResponse):
+    total_videos: int
+    completed_videos: int
+    progress_percentage: float
+    last_activity_at: Optional[datetime] = None
+
+
 class CourseDetailResponse(CourseResponse):
     videos: List[VideoResponse] = []
 
 
+class CourseDetailWithProgressResponse(CourseDetailResponse):
+    progress: List[VideoProgressResponse]
+
+
+class CourseVideoProgressResponse(BaseModel):
+    course_id: int
+    progress: List[VideoProgressResponse]
+
+
+class CoursePage(BaseModel):
+    items: List[CourseResponse]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+
+
 # AI Assistant Schemas
 class AIAssistantRequest(BaseModel):
     video_id: int
@@ -137,5 +187,10 @@ class PomodoroSessionResponse(BaseModel):
 # Token Schema
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
     user: UserResponse
+
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
@@ -0,0 +1,183 @@
+"""
+Per-request SQL profiling.
+
+Engine event hooks time every statement on both engines. While a request
+is being served (see SQLProfilerMiddleware) its statements are counted
+into a RequestProfile held in a context variable, which reaches SQLAlchemy's
+greenlets too. When the request finishes the statement count and database
+time go to the metrics registry, statements slower than SLOW_QUERY_MS are
+logged with their route, and a statement shape repeated
+N_PLUS_ONE_THRESHOLD times or more in one request is logged as a likely
+N+1 query.
+
+assert_query_budget() pins how many statements a block of code (usually
+one in-process request) may run, so query regressions fail a check script
+instead of reaching production.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import config  # noqa: F401  (loads .env)
+from database import async_engine, engine
+from metrics import Histogram, registry
+
+# Profiler configuration
+SQL_PROFILER_ENABLED = os.getenv("SQL_PROFILER_ENABLED", "true").lower() == "true"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+logger = logging.getLogger("sql_profiler")
+
+DB_STATEMENTS_PER_REQUEST = registry.register(Histogram(
+    "http_request_db_statements", "SQL statements run while serving a request, by route template",
+    ["route"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+))
+DB_TIME_PER_REQUEST = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements while serving a request, by route template",
+    ["route"]
+))
+
+
+def route_template(scope: dict) -> str:
+    """The route FastAPI matched for a request, once routing has run."""
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+@dataclass
+class RequestProfile:
+    """Statements run on behalf of one request (or one budgeted block)."""
+    label: str = "-"
+    scope: Optional[dict] = None
+    statements: int = 0
+    db_seconds: float = 0.0
+    shapes: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def route(self) -> str:
+        if self.scope is None:
+            return self.label
+        return f"{self.scope['method']} {route_template(self.scope)}"
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        self.shapes[statement] = self.shapes.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Statement shapes run at least threshold times."""
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+# Profiles of requests finished inside assert_query_budget blocks
+_finished: ContextVar[Optional[List[RequestProfile]]] = ContextVar("sql_profile_finished", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._profiler_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - context._profiler_start
+    profile = _profile.get()
+    if profile is not None:
+        profile.record(statement, seconds)
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms) in %s: %s",
+            seconds * 1000, profile.route if profile else "-", " ".join(statement.split())
+        )
+
+
+def install(target: Engine) -> None:
+    """Time every statement run on an engine."""
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+install(engine)
+install(async_engine.sync_engine)
+
+
+def _short(statement: str, length: int = 200) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= length else statement[:length] + "..."
+
+
+class SQLProfilerMiddleware:
+    """Pure ASGI middleware that profiles the SQL run by each request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope=scope)
+        token = _profile.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _profile.reset(token)
+            self._report(profile)
+
+    @staticmethod
+    def _report(profile: RequestProfile) -> None:
+        template = route_template(profile.scope)
+        DB_STATEMENTS_PER_REQUEST.observe(profile.statements, template)
+        DB_TIME_PER_REQUEST.observe(profile.db_seconds, template)
+        for shape, count in profile.repeated(N_PLUS_ONE_THRESHOLD).items():
+            logger.warning("Possible N+1 in %s: %d x %s", profile.route, count, _short(shape))
+        finished = _finished.get()
+        if finished is not None:
+            finished.append(profile)
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, message: str, profiles: List[RequestProfile]):
+        super().__init__(message)
+        self.profiles = profiles
+
+
+@contextmanager
+def assert_query_budget(max_statements: int, label: str = "block") -> Iterator[List[RequestProfile]]:
+    """
+    Fail if code in the block runs more than max_statements statements.
+
+    Each request served inside the block through an in-process client (the
+    app runs in the caller's context) is checked against the budget on its
+    own; statements run directly in the block are checked together. Yields
+    the list of checked profiles.
+    """
+    direct = RequestProfile(label=label)
+    finished: List[RequestProfile] = []
+    profile_token = _profile.set(direct)
+    finished_token = _finished.set(finished)
+    try:
+        yield finished
+    finally:
+        _profile.reset(profile_token)
+        _finished.reset(finished_token)
+
+    if direct.statements:
+        finished.insert(0, direct)
+    over = [profile for profile in finished if profile.statements > max_statements]
+    if over:
+        details = "\n".join(
+            f"  {profile.route}: {profile.statements} statements\n" + "\n".join(
+                f"    {count} x {_short(shape)}" for shape, count in profile.shapes.items()
+            )
+            for profile in over
+        )
+        raise QueryBudgetExceeded(f"{label}: query budget of {max_statements} exceeded\n{details}", over)
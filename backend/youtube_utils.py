@@ -1,8 +1,44 @@
+import asyncio
+import os
 import re
-import requests
-from typing import Optional, Dict
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List
 from urllib.parse import urlparse, parse_qs
 
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config  # noqa: F401  (loads .env)
+from database import AsyncSessionLocal, dialect_insert
+from metrics import status_class, upstream_timer
+from models import YouTubeMetadata
+
+YOUTUBE_OEMBED_URL = "https://www.youtube.com/oembed"
+YOUTUBE_TIMEOUT_SECONDS = float(os.getenv("YOUTUBE_TIMEOUT_SECONDS", "5"))
+YOUTUBE_FETCH_CONCURRENCY = int(os.getenv("YOUTUBE_FETCH_CONCURRENCY", "8"))
+
+# How long lookups stay cached; failed lookups are retried sooner
+YOUTUBE_METADATA_TTL = timedelta(
+    seconds=int(os.getenv("YOUTUBE_METADATA_TTL_SECONDS", str(30 * 24 * 3600)))
+)
+YOUTUBE_METADATA_NEGATIVE_TTL = timedelta(
+    seconds=int(os.getenv("YOUTUBE_METADATA_NEGATIVE_TTL_SECONDS", "3600"))
+)
+
+# oEmbed answers these when a video doesn't exist, is private or can't be
+# embedded; any other 4xx (such as 429) is treated as transient
+NOT_FOUND_STATUSES = {400, 401, 403, 404}
+
+FALLBACK_METADATA = {
+    "title": "Video Title (Fetch Failed)",
+    "thumbnail": "",
+    "author": "Unknown",
+}
+
+_http_client: Optional[httpx.AsyncClient] = None
+_inflight: Dict[str, asyncio.Future] = {}
+
 
 def extract_youtube_id(url: str) -> Optional[str]:
     """Extract YouTube video ID from various YouTube URL formats."""
@@ -30,33 +66,156 @@ def extract_youtube_id(url: str) -> Optional[str]:
     return None
 
 
-def get_youtube_metadata(video_id: str) -> Optional[Dict]:
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared, pooled HTTP client for YouTube lookups."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(YOUTUBE_TIMEOUT_SECONDS),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (called on shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def _fetch_oembed(video_id: str) -> Optional[Dict]:
     """
-    Get YouTube video metadata using YouTube Data API.
-    For production, use official YouTube API with API key.
-    This is a fallback approach.
+    Fetch metadata from YouTube's oEmbed endpoint.
+
+    Returns None when YouTube says the video doesn't exist or can't be
+    embedded; raises on network errors, rate limiting and other statuses,
+    which the caller must not cache.
     """
-    try:
-        # Using noembed as a fallback for metadata
-        url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                "title": data.get("title", "Unknown Title"),
-                "thumbnail": data.get("thumbnail_url", ""),
-                "author": data.get("author_name", "Unknown Author"),
-            }
-    except Exception as e:
-        print(f"Error fetching YouTube metadata: {e}")
-    
-    return {
-        "title": "Video Title (Fetch Failed)",
-        "thumbnail": "",
-        "author": "Unknown",
+    with upstream_timer("youtube_oembed") as timer:
+        response = await get_http_client().get(
+            YOUTUBE_OEMBED_URL,
+            params={"url": f"https://www.youtube.com/watch?v={video_id}", "format": "json"},
+        )
+        timer.outcome = status_class(response.status_code)
+    if response.status_code == 200:
+        data = response.json()
+        return {
+            "title": data.get("title", "Unknown Title"),
+            "thumbnail": data.get("thumbnail_url", ""),
+            "author": data.get("author_name", "Unknown Author"),
+        }
+    if response.status_code in NOT_FOUND_STATUSES:
+        return None
+    response.raise_for_status()
+
+
+async def _fetch_once(video_id: str) -> Optional[Dict]:
+    """Fetch oEmbed metadata, sharing one request between concurrent callers."""
+    task = _inflight.get(video_id)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_oembed(video_id))
+        _inflight[video_id] = task
+        task.add_done_callback(lambda _: _inflight.pop(video_id, None))
+    # A cancelled caller must not cancel the lookup for everyone else
+    return await asyncio.shield(task)
+
+
+def _cached_metadata(row: YouTubeMetadata) -> Dict:
+    if not row.found:
+        return dict(FALLBACK_METADATA)
+    return {"title": row.title, "thumbnail": row.thumbnail, "author": row.author}
+
+
+def _is_fresh(row: YouTubeMetadata) -> bool:
+    ttl = YOUTUBE_METADATA_TTL if row.found else YOUTUBE_METADATA_NEGATIVE_TTL
+    return row.fetched_at is not None and datetime.utcnow() - row.fetched_at < ttl
+
+
+async def get_youtube_metadata(video_id: str, db: AsyncSession) -> Dict:
+    """
+    Get YouTube video metadata, served from the metadata cache when possible.
+
+    Lookups go to YouTube's oEmbed endpoint on the shared async client and
+    are stored in the youtube_metadata table, including videos YouTube
+    doesn't know (negative caching). The cache row is written in the
+    caller's session and committed with it, so call this with no
+    transaction open and commit soon after (see get_youtube_metadata_many).
+    """
+    return (await get_youtube_metadata_many([video_id], db))[video_id]
+
+
+async def get_youtube_metadata_many(
+    video_ids: List[str],
+    db: AsyncSession,
+    concurrency: int = YOUTUBE_FETCH_CONCURRENCY
+) -> Dict[str, Dict]:
+    """
+    Get metadata for many videos: one cache query, then at most
+    `concurrency` oEmbed requests in flight, then one cache upsert.
+
+    Fetching can take minutes, so no connection is held meanwhile: the
+    cache is read on a short session of its own and the upsert only then
+    starts a transaction in db. Callers must not have one open either.
+    """
+    async with AsyncSessionLocal() as session:
+        cached = {
+            row.youtube_video_id: row
+            for row in (await session.scalars(
+                select(YouTubeMetadata).where(YouTubeMetadata.youtube_video_id.in_(video_ids))
+            )).all()
+        }
+    results = {
+        video_id: _cached_metadata(row)
+        for video_id, row in cached.items()
+        if _is_fresh(row)
     }
 
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(video_id: str):
+        async with semaphore:
+            return await _fetch_once(video_id)
+
+    missing = [video_id for video_id in dict.fromkeys(video_ids) if video_id not in results]
+    fetched = await asyncio.gather(*[fetch(video_id) for video_id in missing], return_exceptions=True)
+
+    rows = []
+    for video_id, metadata in zip(missing, fetched):
+        if isinstance(metadata, Exception):
+            print(f"Error fetching YouTube metadata: {metadata}")
+            # Transient failure: keep serving a stale hit, don't cache the miss
+            stale = cached.get(video_id)
+            results[video_id] = _cached_metadata(stale) if stale is not None else dict(FALLBACK_METADATA)
+            continue
+
+        results[video_id] = metadata or dict(FALLBACK_METADATA)
+        rows.append({
+            "youtube_video_id": video_id,
+            "title": metadata["title"] if metadata else None,
+            "thumbnail": metadata["thumbnail"] if metadata else None,
+            "author": metadata["author"] if metadata else None,
+            "found": metadata is not None,
+            "fetched_at": datetime.utcnow(),
+        })
+
+    if rows:
+        stmt = dialect_insert(db, YouTubeMetadata)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[YouTubeMetadata.youtube_video_id],
+            set_={
+                "title": stmt.excluded.title,
+                "thumbnail": stmt.excluded.thumbnail,
+                "author": stmt.excluded.author,
+                "found": stmt.excluded.found,
+                "fetched_at": stmt.excluded.fetched_at,
+            },
+        )
+        await db.execute(stmt, rows)
+
+    return results
+
 
 def validate_youtube_url(url: str) -> bool:
     """Validate if URL is a valid YouTube URL."""
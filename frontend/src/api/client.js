@@ -19,14 +19,98 @@ apiClient.interceptors.request.use((config) => {
   return config
 })
 
+// Exchange the refresh token for new tokens; concurrent 401s share one request
+let refreshPromise = null
+
+const AUTH_ENDPOINTS = /\/api\/users\/(login|register|refresh|logout)$/
+
+// Tabs share one refresh token in localStorage. When two refresh at once the
+// slower one is rejected because the token was already rotated, so before
+// giving up wait briefly for the other tab's new tokens.
+const waitForRotatedTokens = (staleRefreshToken, timeoutMs = 2000) =>
+  new Promise((resolve) => {
+    const read = () => {
+      const token = localStorage.getItem('token')
+      const refreshToken = localStorage.getItem('refreshToken')
+      return token && refreshToken && refreshToken !== staleRefreshToken ? { token, refreshToken } : null
+    }
+    const rotated = read()
+    if (rotated) {
+      resolve(rotated)
+      return
+    }
+    const finish = (result) => {
+      clearTimeout(timer)
+      window.removeEventListener('storage', onStorage)
+      resolve(result)
+    }
+    const onStorage = () => {
+      const result = read()
+      if (result) finish(result)
+    }
+    const timer = setTimeout(() => finish(null), timeoutMs)
+    window.addEventListener('storage', onStorage)
+  })
+
+const refreshTokens = () => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refreshToken')
+    refreshPromise = (refreshToken
+      ? axios.post(`${API_BASE_URL}/api/users/refresh`, { refresh_token: refreshToken })
+      : Promise.reject(new Error('No refresh token'))
+    )
+      .then((response) => {
+        const { access_token, refresh_token } = response.data
+        useAuthStore.getState().setTokens(access_token, refresh_token)
+        return access_token
+      })
+      .catch(async (error) => {
+        const rotated = refreshToken && await waitForRotatedTokens(refreshToken)
+        if (!rotated) throw error
+        useAuthStore.getState().setTokens(rotated.token, rotated.refreshToken)
+        return rotated.token
+      })
+      .finally(() => {
+        refreshPromise = null
+      })
+  }
+  return refreshPromise
+}
+
+const logoutAndRedirect = () => {
+  useAuthStore.getState().logout()
+  window.location.href = '/login'
+}
+
+// New access token after a 401, for a single retry of the request; logs out
+// when the session can't be refreshed. Used by axios and fetch calls alike.
+const recoverFromUnauthorized = async () => {
+  try {
+    return await refreshTokens()
+  } catch (refreshError) {
+    logoutAndRedirect()
+    throw refreshError
+  }
+}
+
 // Handle response errors
 apiClient.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const request = error.config
+    if (error.response?.status === 401 && request && !request._retried && !AUTH_ENDPOINTS.test(request.url)) {
+      request._retried = true
+      let token
+      try {
+        token = await recoverFromUnauthorized()
+      } catch (refreshError) {
+        return Promise.reject(error)
+      }
+      request.headers.Authorization = `Bearer ${token}`
+      return apiClient(request)
+    }
     if (error.response?.status === 401) {
-      const authStore = useAuthStore.getState()
-      authStore.logout()
-      window.location.href = '/login'
+      logoutAndRedirect()
     }
     return Promise.reject(error)
   }
@@ -39,16 +123,26 @@ export const authAPI = {
   login: (email, password) =>
     apiClient.post('/api/users/login', { email, password }),
   
+  refresh: (refreshToken) =>
+    apiClient.post('/api/users/refresh', { refresh_token: refreshToken }),
+  
+  logout: (refreshToken) =>
+    apiClient.post('/api/users/logout', { refresh_token: refreshToken }),
+  
   getCurrentUser: () =>
     apiClient.get('/api/users/me'),
 }
 
 export const courseAPI = {
-  getCourses: () =>
-    apiClient.get('/api/courses/'),
+  // Pass { limit, cursor } for a page ({ items, next_cursor }) instead of the full list
+  getCourses: (page) =>
+    apiClient.get('/api/courses/', { params: page }),
   
-  getCourseDetail: (courseId) =>
-    apiClient.get(`/api/courses/${courseId}`),
+  getCoursesSummary: () =>
+    apiClient.get('/api/courses/summary'),
+  
+  getCourseDetail: (courseId, include) =>
+    apiClient.get(`/api/courses/${courseId}`, { params: include ? { include } : {} }),
   
   createCourse: (data) =>
     apiClient.post('/api/courses/', data),
@@ -73,8 +167,11 @@ export const videoAPI = {
   addVideo: (courseId, data) =>
     apiClient.post(`/api/videos/${courseId}/add`, data),
   
-  getCourseVideos: (courseId) =>
-    apiClient.get(`/api/videos/course/${courseId}/list`),
+  importVideos: (courseId, urls) =>
+    apiClient.post(`/api/videos/${courseId}/import`, { urls }),
+  
+  getCourseVideos: (courseId, page) =>
+    apiClient.get(`/api/videos/course/${courseId}/list`, { params: page }),
   
   updateVideo: (videoId, data) =>
     apiClient.patch(`/api/videos/${videoId}`, data),
@@ -84,12 +181,18 @@ export const videoAPI = {
   
   reorderVideo: (videoId, newPosition) =>
     apiClient.post(`/api/videos/${videoId}/reorder`, { new_position: newPosition }),
+  
+  setCourseOrder: (courseId, videoIds) =>
+    apiClient.put(`/api/videos/course/${courseId}/order`, { video_ids: videoIds }),
 }
 
 export const progressAPI = {
   updateVideoProgress: (videoId, data) =>
     apiClient.post(`/api/progress/video/${videoId}`, data),
   
+  batchUpdateVideoProgress: (updates) =>
+    apiClient.post('/api/progress/batch', updates),
+  
   getVideoProgress: (videoId) =>
     apiClient.get(`/api/progress/video/${videoId}`),
   
@@ -110,6 +213,48 @@ export const aiAPI = {
   getAssistance: (data) =>
     apiClient.post('/api/ai/assistant', data),
   
+  // Streams the answer over Server-Sent Events, calling onText per chunk.
+  // Abort the signal to stop the stream (the server cancels upstream too).
+  // An expired access token is refreshed and the request retried once, as
+  // for axios calls.
+  streamAssistance: async (data, onText, signal) => {
+    const post = (token) =>
+      fetch(`${API_BASE_URL}/api/ai/assistant/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          Authorization: `Bearer ${token}`,
+        },
+        body: JSON.stringify(data),
+        signal,
+      })
+    let response = await post(localStorage.getItem('token'))
+    if (response.status === 401) {
+      response = await post(await recoverFromUnauthorized())
+    }
+    if (!response.ok) {
+      throw new Error(`AI stream failed with status ${response.status}`)
+    }
+    
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const events = buffer.split('\n\n')
+      buffer = events.pop()
+      for (const event of events) {
+        const lines = event.split('\n')
+        const type = lines.find((line) => line.startsWith('event:'))?.slice(6).trim() || 'message'
+        const payload = JSON.parse(lines.find((line) => line.startsWith('data:'))?.slice(5) || '{}')
+        if (type === 'error') throw new Error(payload.detail)
+        if (type === 'message') onText(payload.text)
+      }
+    }
+  },
+  
   askAboutVideo: (videoId, question) =>
     apiClient.post('/api/ai/ask-about-video', { video_id: videoId, question }),
   
@@ -121,8 +266,8 @@ export const timestampAPI = {
   createTimestamp: (data) =>
     apiClient.post('/api/timestamps/', data),
   
-  getVideoTimestamps: (videoId) =>
-    apiClient.get(`/api/timestamps/video/${videoId}`),
+  getVideoTimestamps: (videoId, page) =>
+    apiClient.get(`/api/timestamps/video/${videoId}`, { params: page }),
   
   updateTimestamp: (timestampId, data) =>
     apiClient.put(`/api/timestamps/${timestampId}`, data),
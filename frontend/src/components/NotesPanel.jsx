@@ -1,9 +1,12 @@
 import { useState, useEffect } from 'react'
 import { timestampAPI } from '../api/client'
 
+const TIMESTAMP_PAGE_SIZE = 50
+
 export default function NotesPanel({ videoId, videoTitle }) {
   const [notes, setNotes] = useState('')
   const [timestamps, setTimestamps] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [manualTime, setManualTime] = useState('0:00:00')
   const [savedMessage, setSavedMessage] = useState('')
   const [loading, setLoading] = useState(false)
@@ -13,15 +16,26 @@ export default function NotesPanel({ videoId, videoTitle }) {
   const [showMultiAdd, setShowMultiAdd] = useState(false)
   const [multiTimestamps, setMultiTimestamps] = useState('')
 
-  // Load timestamps on mount
+  // Load the first page of timestamps on mount
   useEffect(() => {
     fetchTimestamps()
   }, [videoId])
 
-  const fetchTimestamps = async () => {
+  // Without a cursor, replaces the list with the first page; with one, appends
+  // the next page (skipping timestamps already added locally)
+  const fetchTimestamps = async (cursor = null) => {
     try {
-      const response = await timestampAPI.getVideoTimestamps(videoId)
-      setTimestamps(response.data || [])
+      const response = await timestampAPI.getVideoTimestamps(videoId, {
+        limit: TIMESTAMP_PAGE_SIZE,
+        ...(cursor && { cursor }),
+      })
+      const { items, next_cursor } = response.data
+      setTimestamps((prev) => {
+        if (!cursor) return items
+        const known = new Set(prev.map((t) => t.id))
+        return [...prev, ...items.filter((t) => !known.has(t.id))].sort((a, b) => a.time_seconds - b.time_seconds)
+      })
+      setNextCursor(next_cursor)
     } catch (error) {
       console.error('Failed to fetch timestamps:', error)
     }
@@ -299,7 +313,7 @@ export default function NotesPanel({ videoId, videoTitle }) {
           {/* Timestamps List */}
           <div className="flex-1 overflow-y-auto">
             <label className="block text-xs font-semibold text-gray-300 mb-2">
-              Saved ({timestamps.length})
+              Saved ({timestamps.length}{nextCursor ? '+' : ''})
             </label>
             {timestamps.length === 0 ? (
               <div className="text-gray-400 text-xs text-center py-4">
@@ -370,6 +384,14 @@ export default function NotesPanel({ videoId, videoTitle }) {
                     )}
                   </div>
                 ))}
+                {nextCursor && (
+                  <button
+                    onClick={() => fetchTimestamps(nextCursor)}
+                    className="w-full px-2 py-1 bg-gray-700 text-gray-300 rounded hover:bg-gray-600 transition text-xs"
+                  >
+                    Load more
+                  </button>
+                )}
               </div>
             )}
           </div>
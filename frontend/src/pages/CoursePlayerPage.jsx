@@ -35,26 +35,19 @@ export default function CoursePlayerPage() {
 
   const fetchCourse = async () => {
     try {
-      const response = await courseAPI.getCourseDetail(courseId)
-      setCourse(response.data)
-      setLoading(false)
-      fetchVideoCompletion()
-    } catch (error) {
-      console.error('Failed to fetch course:', error)
-      navigate('/dashboard')
-    }
-  }
-
-  const fetchVideoCompletion = async () => {
-    try {
-      const response = await progressAPI.getCourseProgress(courseId)
+      // One round trip for the course, its videos and our progress
+      const response = await courseAPI.getCourseDetail(courseId, 'progress')
+      const { progress, ...courseData } = response.data
       const completionMap = {}
-      response.data.progress.forEach((prog) => {
+      progress.forEach((prog) => {
         completionMap[prog.video_id] = prog.completed || false
       })
+      setCourse(courseData)
       setVideoCompletion(completionMap)
+      setLoading(false)
     } catch (error) {
-      console.error('Failed to fetch completion:', error)
+      console.error('Failed to fetch course:', error)
+      navigate('/dashboard')
     }
   }
 
@@ -107,18 +100,17 @@ export default function CoursePlayerPage() {
       return
     }
 
-    for (const url of urls) {
-      try {
-        const response = await videoAPI.addVideo(courseId, {
-          youtube_url: url,
-        })
-        setCourse({
-          ...course,
-          videos: [...course.videos, response.data],
-        })
-      } catch (error) {
-        console.error('Failed to add video:', error)
+    try {
+      const response = await videoAPI.importVideos(courseId, urls)
+      setCourse({
+        ...course,
+        videos: [...course.videos, ...response.data.videos],
+      })
+      if (response.data.invalid.length > 0) {
+        alert(`Skipped invalid URLs:\n${response.data.invalid.join('\n')}`)
       }
+    } catch (error) {
+      console.error('Failed to add videos:', error)
     }
 
     setYoutubeUrls('')
@@ -160,12 +152,10 @@ export default function CoursePlayerPage() {
     newVideos.splice(draggedVideo, 1)
     newVideos.splice(targetIndex, 0, draggedItem)
 
-    for (let i = 0; i < newVideos.length; i++) {
-      try {
-        await videoAPI.reorderVideo(newVideos[i].id, i)
-      } catch (error) {
-        console.error('Failed to reorder video:', error)
-      }
+    try {
+      await videoAPI.reorderVideo(draggedItem.id, targetIndex)
+    } catch (error) {
+      console.error('Failed to reorder video:', error)
     }
 
     setCourse({ ...course, videos: newVideos })
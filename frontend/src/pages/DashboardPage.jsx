@@ -2,11 +2,11 @@ import { useState, useEffect } from 'react'
 import { Link, useNavigate } from 'react-router-dom'
 import { useAuthStore } from '../store/authStore'
 import { useCourseStore } from '../store/courseStore'
-import { courseAPI } from '../api/client'
+import { authAPI, courseAPI } from '../api/client'
 
 export default function DashboardPage() {
   const navigate = useNavigate()
-  const { user, logout } = useAuthStore()
+  const { user, refreshToken, logout } = useAuthStore()
   const { courses, setCourses } = useCourseStore()
   const [loading, setLoading] = useState(true)
   const [showCreateModal, setShowCreateModal] = useState(false)
@@ -26,7 +26,7 @@ export default function DashboardPage() {
 
   const fetchCourses = async () => {
     try {
-      const response = await courseAPI.getCourses()
+      const response = await courseAPI.getCoursesSummary()
       setCourses(response.data)
     } catch (error) {
       console.error('Failed to fetch courses:', error)
@@ -98,6 +98,9 @@ export default function DashboardPage() {
             <span className="text-sm text-gray-600">{user?.email}</span>
             <button
               onClick={() => {
+                if (refreshToken) {
+                  authAPI.logout(refreshToken).catch(() => {})
+                }
                 logout()
                 navigate('/login')
               }}
@@ -176,6 +179,20 @@ export default function DashboardPage() {
                     <p className="text-gray-600 text-sm mb-4 line-clamp-2">
                       {course.description || 'No description'}
                     </p>
+                    {course.total_videos !== undefined && (
+                      <div className="mb-4">
+                        <div className="flex justify-between text-xs text-gray-500 mb-1">
+                          <span>{course.completed_videos} / {course.total_videos} videos</span>
+                          <span>{Math.round(course.progress_percentage)}%</span>
+                        </div>
+                        <div className="w-full bg-gray-200 rounded-full h-2">
+                          <div
+                            className="bg-indigo-600 h-2 rounded-full"
+                            style={{ width: `${course.progress_percentage}%` }}
+                          />
+                        </div>
+                      </div>
+                    )}
                     <div className="flex gap-2">
                       <Link
                         to={`/course/${course.id}`}
@@ -18,8 +18,8 @@ export default function LoginPage() {
 
     try {
       const response = await authAPI.login(email, password)
-      const { access_token, user } = response.data
-      login(user, access_token)
+      const { access_token, refresh_token, user } = response.data
+      login(user, access_token, refresh_token)
       navigate('/dashboard')
     } catch (err) {
       setError(err.response?.data?.detail || 'Login failed. Please try again.')
@@ -30,8 +30,8 @@ export default function RegisterPage() {
 
     try {
       const response = await authAPI.register(email, password)
-      const { access_token, user } = response.data
-      login(user, access_token)
+      const { access_token, refresh_token, user } = response.data
+      login(user, access_token, refresh_token)
       navigate('/dashboard')
     } catch (err) {
       setError(err.response?.data?.detail || 'Registration failed. Please try again.')
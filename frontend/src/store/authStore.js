@@ -3,16 +3,27 @@ import { create } from 'zustand'
 export const useAuthStore = create((set) => ({
   user: null,
   token: localStorage.getItem('token') || null,
+  refreshToken: localStorage.getItem('refreshToken') || null,
   isAuthenticated: !!localStorage.getItem('token'),
 
-  login: (user, token) => {
+  login: (user, token, refreshToken) => {
     localStorage.setItem('token', token)
-    set({ user, token, isAuthenticated: true })
+    if (refreshToken) {
+      localStorage.setItem('refreshToken', refreshToken)
+    }
+    set({ user, token, refreshToken: refreshToken || null, isAuthenticated: true })
+  },
+
+  setTokens: (token, refreshToken) => {
+    localStorage.setItem('token', token)
+    localStorage.setItem('refreshToken', refreshToken)
+    set({ token, refreshToken, isAuthenticated: true })
   },
 
   logout: () => {
     localStorage.removeItem('token')
-    set({ user: null, token: null, isAuthenticated: false })
+    localStorage.removeItem('refreshToken')
+    set({ user: null, token: null, refreshToken: null, isAuthenticated: false })
   },
 
   setUser: (user) => set({ user }),